@@ -1,20 +1,30 @@
-from flask import Flask, redirect
+from flask import Flask, Response, redirect
 
 # Import handlers - try both import styles to work locally and in production
 try:
     from api.view import catch_all as view_handler
     from api.view import widget as widget_handler
+    from api.view import widget_events as widget_events_handler
+    from api.view import now_playing as now_handler
+    from api.view import batch as batch_handler
     from api.trakt_login import catch_all as trakt_login_handler
     from api.trakt_callback import catch_all as trakt_callback_handler
 except ModuleNotFoundError:
     from view import catch_all as view_handler
     from view import widget as widget_handler
+    from view import widget_events as widget_events_handler
+    from view import now_playing as now_handler
+    from view import batch as batch_handler
     from trakt_login import catch_all as trakt_login_handler
     from trakt_callback import catch_all as trakt_callback_handler
 
+from util import metrics, tracing
+
 view_svg_handler = view_handler  # view.svg.py is identical to view.py
 
 app = Flask(__name__)
+metrics.init_app(app, theme_routes=("view", "view_svg"))
+tracing.init_app(app)
 
 
 @app.route("/")
@@ -66,5 +76,31 @@ def widget():
     return widget_handler()
 
 
+@app.route("/api/widget/events")
+def widget_events():
+    """Server-Sent Events stream telling the widget when to reload"""
+    return widget_events_handler()
+
+
+@app.route("/api/now")
+def now():
+    """Compact JSON of the now-playing state for client-side widgets"""
+    return now_handler()
+
+
+@app.route("/api/batch", methods=["POST"])
+def batch():
+    """Render several cards in one request"""
+    return batch_handler()
+
+
+
+@app.route("/metrics", endpoint="metrics")
+def metrics_endpoint():
+    """Prometheus metrics, summed over all gunicorn workers in multiprocess mode"""
+    body, content_type = metrics.render_metrics()
+    return Response(body, content_type=content_type)
+
+
 if __name__ == "__main__":
     app.run(debug=True, port=3000)
@@ -0,0 +1,104 @@
+from dotenv import load_dotenv, find_dotenv
+import argparse
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep, time
+
+load_dotenv(find_dotenv())
+
+from util.firestore import get_firestore_db
+from util.state_store import (
+    NOW_PLAYING_FAST_INTERVAL,
+    NOW_PLAYING_SLOW_INTERVAL,
+    get_state_store,
+    next_poll_delay,
+)
+from util import tokens, trakt
+
+print("Starting Now Playing Poller")
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Only poll users whose card was requested within this many seconds
+POLLER_ACTIVE_WINDOW = int(os.getenv("POLLER_ACTIVE_WINDOW", "1800"))
+POLLER_WORKERS = int(os.getenv("POLLER_WORKERS", "4"))
+POLLER_TICK = float(os.getenv("POLLER_TICK", "1"))
+
+
+def poll_user(db, store, uid):
+    """Poll one user; returns False if the poll failed and was backed off"""
+    try:
+        access_token = tokens.get_access_token(db, uid)
+        if not access_token:
+            # Unknown user or must re-login; stop polling until they show up again
+            store.forget(uid)
+            return True
+
+        try:
+            data = trakt.get_current_playback(access_token)
+        except trakt.TraktAuthError:
+            tokens.invalidate(uid)
+            store.forget(uid)
+            return True
+        except trakt.UpstreamError as e:
+            # Keep the last known state rather than recording the user as idle;
+            # it ages out after NOW_PLAYING_MAX_AGE if Trakt stays down
+            logger.warning(f"Trakt unavailable for {uid}: {e}")
+            store.reschedule(uid, time() + NOW_PLAYING_FAST_INTERVAL)
+            return False
+
+        store.put(uid, data, time() + next_poll_delay(data))
+        return True
+    except Exception as e:
+        # A revoked refresh token or a Firestore error would fail again on
+        # the next pass; back off instead of retrying it in a tight loop
+        logger.error(f"Polling failed for {uid}: {e}")
+        store.reschedule(uid, time() + NOW_PLAYING_SLOW_INTERVAL)
+        return False
+
+
+def run_once(db, store, executor):
+    """Poll every due user once; returns how many were polled successfully"""
+    uids = store.due_users(POLLER_ACTIVE_WINDOW, limit=POLLER_WORKERS * 25)
+    futures = [executor.submit(poll_user, db, store, uid) for uid in uids]
+    polled = 0
+    for uid, future in zip(uids, futures):
+        try:
+            polled += bool(future.result())
+        except Exception as e:
+            logger.error(f"Polling failed for {uid}: {e}")
+    return polled
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Poll Trakt watching state for active users"
+    )
+    parser.add_argument("--once", action="store_true", help="run a single pass")
+    args = parser.parse_args()
+
+    store = get_state_store()
+    if store is None:
+        raise SystemExit("NOW_PLAYING_STORE must be set to run the poller")
+
+    db = get_firestore_db()
+
+    with ThreadPoolExecutor(max_workers=POLLER_WORKERS) as executor:
+        while True:
+            try:
+                polled = run_once(db, store, executor)
+            except Exception as e:
+                logger.error(f"Poll pass failed: {e}")
+                polled = 0
+
+            if args.once:
+                break
+            # Nothing was due, or every poll failed
+            if not polled:
+                sleep(POLLER_TICK)
+
+
+if __name__ == "__main__":
+    # NOW_PLAYING_STORE=/path/state.db python api/now_playing_poller.py
+    main()
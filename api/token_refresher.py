@@ -0,0 +1,56 @@
+from dotenv import load_dotenv, find_dotenv
+import argparse
+import logging
+import os
+from time import sleep, time
+
+load_dotenv(find_dotenv())
+
+from util.firestore import get_firestore_db
+from util import tokens
+
+print("Starting Trakt Token Refresher")
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Refresh tokens that expire within this many seconds
+TOKEN_REFRESH_WINDOW = int(os.getenv("TOKEN_REFRESH_WINDOW", "86400"))
+TOKEN_REFRESH_INTERVAL = int(os.getenv("TOKEN_REFRESH_INTERVAL", "900"))
+TOKEN_REFRESH_BATCH = int(os.getenv("TOKEN_REFRESH_BATCH", "50"))
+TOKEN_REFRESH_RATE = float(os.getenv("TOKEN_REFRESH_RATE", "2"))
+
+
+def run_once(db):
+    started = time()
+    count = tokens.refresh_expiring_tokens(
+        db,
+        TOKEN_REFRESH_WINDOW,
+        batch_size=TOKEN_REFRESH_BATCH,
+        rate=TOKEN_REFRESH_RATE,
+    )
+    logger.info(f"Refresh pass done: {count} tokens valid, took {time() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Refresh Trakt tokens before they expire"
+    )
+    parser.add_argument("--once", action="store_true", help="run a single pass")
+    args = parser.parse_args()
+
+    db = get_firestore_db()
+
+    while True:
+        try:
+            run_once(db)
+        except Exception as e:
+            logger.error(f"Refresh pass failed: {e}")
+
+        if args.once:
+            break
+        sleep(TOKEN_REFRESH_INTERVAL)
+
+
+if __name__ == "__main__":
+    # python api/token_refresher.py [--once]
+    main()
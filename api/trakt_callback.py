@@ -5,14 +5,14 @@ import logging
 
 load_dotenv(find_dotenv())
 
-from util.firestore import get_firestore_db
-from util import trakt
+from util.firestore import LazyFirestore
+from util import trakt, tracing
 
 print("Starting Trakt Callback Server")
-logging.basicConfig(level=logging.INFO)
+tracing.init_logging(logging.INFO)
 logger = logging.getLogger(__name__)
 
-db = get_firestore_db()
+db = LazyFirestore()
 
 app = Flask(__name__)
 
@@ -1,31 +1,146 @@
 from flask import Flask, Response, jsonify, render_template, redirect, request
 from base64 import b64decode, b64encode
 from dotenv import load_dotenv, find_dotenv
+from werkzeug.datastructures import MultiDict
 
-from util.firestore import get_firestore_db
+from util.firestore import LazyFirestore
 from util.profanity import profanity_check
 
 load_dotenv(find_dotenv())
 
-from PIL import Image, ImageFile
-
-from time import time
-
-import io
-from util import trakt
+from concurrent.futures import wait
+from time import sleep, time
+
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+import uuid
+from util import http_client, images, metrics, tokens, tracing, trakt
+from util.cache import LastGoodCache, TTLCache
+from util.colors import extract_palette, pick_bar_color
+from util.poster_store import get_poster_store
+from util.state_store import NOW_PLAYING_MAX_AGE, get_state_store, next_poll_delay
 import random
-import requests
 import functools
-import colorgram
-import math
 import html
 
-ImageFile.LOAD_TRUNCATED_IMAGES = True
-
 print("Starting Server")
 
-db = get_firestore_db()
+db = LazyFirestore()
 app = Flask(__name__)
+metrics.init_app(app, theme_routes=("catch_all",))
+tracing.init_app(app)
+
+# Shared pool for upstream calls that don't depend on each other
+UPSTREAM_WORKERS = int(os.getenv("UPSTREAM_WORKERS", "8"))
+executor = tracing.ContextThreadPoolExecutor(
+    max_workers=UPSTREAM_WORKERS, thread_name_prefix="upstream"
+)
+
+# Separate pool for recents posters so history tasks never wait on themselves
+RECENTS_POSTER_WORKERS = int(os.getenv("RECENTS_POSTER_WORKERS", "6"))
+RECENTS_POSTER_DEADLINE = float(os.getenv("RECENTS_POSTER_DEADLINE", "2.5"))
+poster_executor = tracing.ContextThreadPoolExecutor(
+    max_workers=RECENTS_POSTER_WORKERS, thread_name_prefix="poster"
+)
+
+# A card render marks its uid as active for the poller at most this often
+NOW_PLAYING_TOUCH_INTERVAL = int(os.getenv("NOW_PLAYING_TOUCH_INTERVAL", "60"))
+_touched = TTLCache(maxsize=4096, ttl=NOW_PLAYING_TOUCH_INTERVAL)
+
+# Last known good playback state and recents per uid, served straight away
+# while Trakt or TMDB is failing or takes longer than STALE_BUDGET seconds;
+# a background refresh retries every STALE_RETRY_AFTER seconds
+STALE_BUDGET = float(os.getenv("STALE_BUDGET", "1.0"))
+STALE_RETRY_AFTER = float(os.getenv("STALE_RETRY_AFTER", "10"))
+STALE_MAX_AGE = int(os.getenv("STALE_MAX_AGE", "3600"))
+STALE_CACHE_SIZE = int(os.getenv("STALE_CACHE_SIZE", "1024"))
+REFRESH_WORKERS = int(os.getenv("REFRESH_WORKERS", "16"))
+refresh_executor = tracing.ContextThreadPoolExecutor(
+    max_workers=REFRESH_WORKERS, thread_name_prefix="refresh"
+)
+media_states = LastGoodCache(
+    refresh_executor,
+    budget=STALE_BUDGET,
+    retry_after=STALE_RETRY_AFTER,
+    max_age=STALE_MAX_AGE,
+    maxsize=STALE_CACHE_SIZE,
+    name="media_state",
+)
+recent_histories = LastGoodCache(
+    refresh_executor,
+    budget=STALE_BUDGET,
+    retry_after=STALE_RETRY_AFTER,
+    max_age=STALE_MAX_AGE,
+    maxsize=STALE_CACHE_SIZE,
+    name="recents",
+)
+
+# Rendered SVGs keyed by uid, upstream state fingerprint and query params
+SVG_CACHE_TTL = int(os.getenv("SVG_CACHE_TTL", "60"))
+SVG_CACHE_SIZE = int(os.getenv("SVG_CACHE_SIZE", "256"))
+svg_cache = TTLCache(maxsize=SVG_CACHE_SIZE, ttl=SVG_CACHE_TTL, name="svg")
+
+# Browser/proxy caching for offline and "recently played" cards (seconds)
+SVG_IDLE_MAX_AGE = int(os.getenv("SVG_IDLE_MAX_AGE", "60"))
+SVG_STALE_WHILE_REVALIDATE = int(os.getenv("SVG_STALE_WHILE_REVALIDATE", "300"))
+
+# Largest number of cards rendered by one /batch request
+BATCH_MAX_SPECS = int(os.getenv("BATCH_MAX_SPECS", "20"))
+
+# Largest number of recents one /now poll asks Trakt for
+NOW_MAX_RECENTS = int(os.getenv("NOW_MAX_RECENTS", "10"))
+
+# Widget event stream: the shortest interval between state checks (streams
+# never check more often than their widget's refresh), how long one
+# connection lasts before the browser reconnects, and how many streams a
+# worker holds open at once; each one occupies a worker thread
+WIDGET_STREAM_POLL_INTERVAL = float(os.getenv("WIDGET_STREAM_POLL_INTERVAL", "5"))
+WIDGET_STREAM_DURATION = int(os.getenv("WIDGET_STREAM_DURATION", "300"))
+WIDGET_STREAM_RETRY_MS = int(os.getenv("WIDGET_STREAM_RETRY_MS", "3000"))
+WIDGET_STREAM_MAX_CONNECTIONS = int(os.getenv("WIDGET_STREAM_MAX_CONNECTIONS", "8"))
+_widget_streams = threading.BoundedSemaphore(WIDGET_STREAM_MAX_CONNECTIONS)
+# Latest state id per (uid, show_offline), shared by all streams of a worker
+widget_stream_states = TTLCache(maxsize=1024, ttl=WIDGET_STREAM_POLL_INTERVAL)
+
+# Size (CSS px) each template displays the cover and recents posters at
+THEME_IMAGE_SIZES = {
+    "default": {"cover": (300, 450), "recent": (32, 48)},
+    "compact": {"cover": (280, 420), "recent": (24, 36)},
+    "karaoke": {"cover": (300, 450), "recent": (24, 36)},
+    "apple": {"cover": (288, 432), "recent": (28, 42)},
+    "natemoo-re": {"cover": (60, 60), "recent": (20, 30)},
+    "novatorem": {"cover": (64, 64), "recent": (24, 36)},
+    "stremio-embed": {"cover": (88, 88), "recent": (28, 42)},
+    "widget": {"cover": (80, 120), "recent": (32, 48)},
+}
+
+# Downloaded images are bounded by total bytes per worker; failed downloads
+# are remembered for IMAGE_NEGATIVE_TTL seconds only
+IMAGE_CACHE_BYTES = int(os.getenv("IMAGE_CACHE_BYTES", str(32 * 1024 * 1024)))
+IMAGE_CACHE_TTL = int(os.getenv("IMAGE_CACHE_TTL", "86400"))
+IMAGE_NEGATIVE_TTL = int(os.getenv("IMAGE_NEGATIVE_TTL", "30"))
+image_cache = TTLCache(
+    maxsize=4096, ttl=IMAGE_CACHE_TTL, max_bytes=IMAGE_CACHE_BYTES, name="image"
+)
+
+# Downscaled and recompressed images keyed by (url, size, format)
+PROCESSED_IMAGE_CACHE_BYTES = int(
+    os.getenv("PROCESSED_IMAGE_CACHE_BYTES", str(16 * 1024 * 1024))
+)
+processed_image_cache = TTLCache(
+    maxsize=4096,
+    ttl=IMAGE_CACHE_TTL,
+    max_bytes=PROCESSED_IMAGE_CACHE_BYTES,
+    name="processed_image",
+)
+
+# Cover color palettes keyed by image content hash
+palette_cache = TTLCache(maxsize=4096, ttl=IMAGE_CACHE_TTL, name="palette")
+
+_MISSING = object()
 
 
 @functools.lru_cache(maxsize=128)
@@ -45,11 +160,13 @@ def generate_css_bar(num_bar=75):
     return css_bar
 
 
-@functools.lru_cache(maxsize=128)
-def load_image(url):
+def download_image(url):
+    import requests
+
     try:
-        response = requests.get(url, timeout=10)
-        response.raise_for_status()
+        with metrics.stage("poster_download"):
+            response = http_client.get(url, timeout=10)
+            response.raise_for_status()
         return response.content
     except requests.exceptions.RequestException as e:
         print(f"Error loading image from {url}: {e}")
@@ -60,24 +177,108 @@ def load_image(url):
         return None
 
 
+def load_image(url):
+    """
+    Return the image bytes for url, or None if it can't be downloaded.
+    Failures are cached briefly so a broken poster is retried soon.
+    """
+    with tracing.span("load_image", url=url):
+        return _load_image(url)
+
+
+def _load_image(url):
+    content = image_cache.get(url, _MISSING)
+    if content is not _MISSING:
+        return content
+
+    # Shared on-disk store, so workers don't each download the same poster
+    store = get_poster_store()
+    content = store.get(url) if store is not None else None
+
+    if content is None:
+        content = download_image(url)
+        if content is not None and store is not None:
+            store.put(url, content)
+
+    if content is None:
+        image_cache.set(url, None, ttl=IMAGE_NEGATIVE_TTL)
+    else:
+        image_cache.set(url, content)
+    return content
+
+
+def get_palette(content):
+    """Dominant colors of an image, memoized by content hash"""
+    key = hashlib.sha1(content).hexdigest()
+    colors = palette_cache.get(key)
+    if colors is not None:
+        return colors
+
+    try:
+        with metrics.stage("palette"):
+            colors = extract_palette(content, 5)
+    except Exception as e:
+        print(f"Error extracting colors from image: {e}")
+        return []
+
+    palette_cache.set(key, colors)
+    return colors
+
+
 def to_img_b64(content):
     if content is None:
         return ""
     return b64encode(content).decode("ascii")
 
 
-def load_image_b64(url):
-    return to_img_b64(load_image(url))
+def load_image_sized(url, size):
+    """
+    Load url and downscale it for display at size (CSS width, height).
+    Falls back to the original bytes if the image can't be processed.
+    """
+    key = (url, size, images.IMAGE_FORMAT)
+    content = processed_image_cache.get(key)
+    if content is not None:
+        return content
+
+    content = load_image(url)
+    if content is None:
+        return None
+
+    with metrics.stage("image_process"):
+        content = images.process_image(content, size) or content
+    processed_image_cache.set(key, content)
+    return content
+
 
+def load_image_b64(url, size=None):
+    if size is None:
+        return to_img_b64(load_image(url))
+    return to_img_b64(load_image_sized(url, size))
 
-def isLightOrDark(rgbColor=[0, 128, 255], threshold=127.5):
-    # https://stackoverflow.com/a/58270890
-    [r, g, b] = rgbColor
-    hsp = math.sqrt(0.299 * (r * r) + 0.587 * (g * g) + 0.114 * (b * b))
-    if hsp > threshold:
-        return "light"
-    else:
-        return "dark"
+
+def get_image_size(theme, kind):
+    sizes = THEME_IMAGE_SIZES.get(theme, THEME_IMAGE_SIZES["default"])
+    return sizes[kind]
+
+
+def img_b64_mime(img_b64):
+    """MIME type of a base64-encoded image, decoding only its header"""
+    try:
+        return images.image_mime(b64decode(img_b64[:16]))
+    except ValueError:
+        return "image/jpeg"
+
+
+def future_result(future, default=None):
+    """Wait for a background upstream call, falling back to default on error."""
+    if future is None:
+        return default
+    try:
+        return future.result()
+    except Exception as e:
+        print(f"Error in background upstream call: {e}")
+        return default
 
 
 def encode_html_entities(text):
@@ -124,6 +325,7 @@ def calculate_progress_data(progress_ms, duration_ms):
 
 
 # @functools.lru_cache(maxsize=128)
+@tracing.traced("make_svg")
 def make_svg(
     media_info,
     media_title,
@@ -138,6 +340,7 @@ def make_svg(
     progress_ms=None,
     duration_ms=None,
     recents=None,
+    img_mime="image/jpeg",
 ):
     height = 0
     num_bar = 75
@@ -209,6 +412,7 @@ def make_svg(
         "media_info": media_info,
         "media_title": media_title,
         "img": img,
+        "img_mime": img_mime,
         "cover_image": cover_image,
         "bar_color": bar_color,
         "background_color": background_color,
@@ -223,64 +427,87 @@ def make_svg(
     }
 
     # Use stremio template
-    return render_template(f"stremio.{theme}.html.j2", **rendered_data)
+    with metrics.stage("render"):
+        return render_template(f"stremio.{theme}.html.j2", **rendered_data)
 
 
-def get_trakt_media_info(uid, show_offline):
+def get_current_playback(uid, user=None):
     """
-    Retrieve playback info for a Trakt-linked user stored in Firestore under `uid`.
-    Returns item, is_now_playing, progress_ms, duration_ms
+    Return the raw Trakt watching data for uid ({} when idle), preferring the
+    state kept fresh by the now-playing poller over a live Trakt call.
+    user is the request's tokens.UserContext, shared with other fetches.
+    Returns None if the user has no usable token; raises trakt.UpstreamError
+    when Trakt is failing.
     """
     import logging
     logger = logging.getLogger(__name__)
-    logger.info(f"get_trakt_media_info called with uid={uid}, show_offline={show_offline}")
-    
-    # Load token from firebase
-    doc_ref = db.collection("users").document(uid)
-    doc = doc_ref.get()
 
-    if not doc.exists:
-        logger.warning(f"No document found for uid: {uid}")
-        return None, False, None, None
-
-    token_info = doc.to_dict()
-    logger.info(f"Token info keys: {list(token_info.keys()) if token_info else 'None'}")
-
-    current_ts = int(time())
-    access_token = token_info.get("access_token")
+    store = get_state_store()
+    if store is not None:
+        try:
+            if _touched.get(uid) is None:
+                store.touch(uid)
+                _touched.set(uid, True)
+            data = store.get(uid, max_age=NOW_PLAYING_MAX_AGE)
+        except sqlite3.Error as e:
+            # e.g. "database is locked"; ask Trakt directly instead
+            logger.error(f"Now-playing store unavailable: {e}")
+            store = None
+            data = None
+        if data is not None:
+            logger.info("Using polled now-playing state")
+            return data
+
+    if user is None:
+        user = tokens.UserContext(db, uid)
+    access_token = user.access_token()
     logger.info(f"Access token exists: {access_token is not None}")
 
-    # Refresh if expired
-    expired_ts = token_info.get("expired_ts")
-    if expired_ts is None or current_ts >= expired_ts:
-        logger.info(f"Token expired or no expiry. Current: {current_ts}, Expired: {expired_ts}")
-        refresh_token = token_info.get("refresh_token")
-        if not refresh_token:
-            logger.error("No refresh_token available")
-            return None, False, None, None
+    if not access_token:
+        return None
 
-        logger.info("Attempting token refresh...")
-        new_token = trakt.refresh_token(refresh_token)
+    # Query Trakt for current playback
+    logger.info("Querying Trakt for current playback...")
+    try:
+        data = trakt.get_current_playback(access_token)
+    except trakt.TraktAuthError:
+        user.invalidate()
+        raise
 
-        # If Trakt returns error, drop token
-        if new_token.get("error"):
-            logger.error(f"Token refresh failed: {new_token.get('error')}")
-            doc_ref.delete()
-            return None, False, None, None
+    if store is not None:
+        try:
+            store.put(uid, data, time() + next_poll_delay(data))
+        except sqlite3.Error as e:
+            logger.error(f"Could not save now-playing state: {e}")
+    return data
 
-        expired_ts = int(time()) + int(new_token.get("expires_in", 0))
-        update_data = {
-            "access_token": new_token.get("access_token"),
-            "refresh_token": new_token.get("refresh_token", refresh_token),
-            "expired_ts": expired_ts,
-        }
-        doc_ref.update(update_data)
-        access_token = update_data["access_token"]
-        logger.info("Token refreshed successfully")
 
-    # Query Trakt for current playback
-    logger.info("Querying Trakt for current playback...")
-    data = trakt.get_current_playback(access_token)
+def get_trakt_media_info(uid, show_offline, user=None, failures=None):
+    """
+    Retrieve playback info for a Trakt-linked user stored in Firestore under `uid`.
+    `user` is the request's tokens.UserContext.
+    A rejected token reads as nothing playing, like before it was checked.
+    A failing Trakt reads as nothing playing and a failing TMDB as no
+    metadata; their names are added to the `failures` set if one is given.
+    Returns item, is_now_playing, progress_ms, duration_ms
+    """
+    import logging
+    logger = logging.getLogger(__name__)
+    logger.info(f"get_trakt_media_info called with uid={uid}, show_offline={show_offline}")
+    
+    try:
+        data = get_current_playback(uid, user)
+    except trakt.TraktAuthError:
+        # get_current_playback has invalidated the token already
+        logger.warning("Trakt rejected the access token")
+        data = {}
+    except trakt.UpstreamError as e:
+        logger.error(f"Trakt unavailable: {e}")
+        if failures is not None:
+            failures.add("trakt")
+        data = {}
+    if data is None:
+        return None, False, None, None
 
     item = None
     is_now_playing = False
@@ -310,13 +537,11 @@ def get_trakt_media_info(uid, show_offline):
             if episode_title:
                 episode_label = f"{episode_label} - {episode_title}"
             
-            # Get TMDB ID and fetch actual poster
+            # Get TMDB ID and fetch poster and metadata in one call
             tmdb_id = show_info.get("ids", {}).get("tmdb")
-            poster_url = trakt.get_tmdb_poster(tmdb_id, "tv")
-            
-            # Get additional metadata from TMDB
-            tmdb_details = trakt.get_tmdb_details(tmdb_id, "tv")
-            genres = ", ".join([g.get("name", "") for g in tmdb_details.get("genres", [])[:2]])
+            tmdb_meta = get_tmdb_metadata(tmdb_id, "tv", failures)
+            poster_url = tmdb_meta.get("poster_url")
+            genres = ", ".join(tmdb_meta.get("genres", [])[:2])
             
             # Build show title with year
             media_info = show_title
@@ -338,14 +563,12 @@ def get_trakt_media_info(uid, show_offline):
             movie_title = movie_info.get("title", data.get("title", ""))
             movie_year = movie_info.get("year", "")
             
-            # Get TMDB ID and fetch actual poster
+            # Get TMDB ID and fetch poster and metadata in one call
             tmdb_id = movie_info.get("ids", {}).get("tmdb")
-            poster_url = trakt.get_tmdb_poster(tmdb_id, "movie")
-            
-            # Get additional metadata from TMDB
-            tmdb_details = trakt.get_tmdb_details(tmdb_id, "movie")
-            genres = ", ".join([g.get("name", "") for g in tmdb_details.get("genres", [])[:2]])
-            runtime = tmdb_details.get("runtime", 0)
+            tmdb_meta = get_tmdb_metadata(tmdb_id, "movie", failures)
+            poster_url = tmdb_meta.get("poster_url")
+            genres = ", ".join(tmdb_meta.get("genres", [])[:2])
+            runtime = tmdb_meta.get("runtime", 0)
             
             # Build display title
             display_title = movie_title
@@ -397,27 +620,115 @@ def get_trakt_media_info(uid, show_offline):
     return item, is_now_playing, progress_ms, duration_ms
 
 
-def get_watch_history(uid, limit=5):
+def get_tmdb_metadata(tmdb_id, media_type, failures=None):
+    """trakt.get_tmdb_metadata, adding "tmdb" to failures when TMDB is failing"""
+    try:
+        return trakt.get_tmdb_metadata(tmdb_id, media_type, strict=True)
+    except trakt.UpstreamError as e:
+        print(f"TMDB unavailable: {e}")
+        if failures is not None:
+            failures.add("tmdb")
+        return {}
+
+
+def visible_state(state, show_offline):
+    """Hide an idle state unless the card shows offline status"""
+    if not show_offline and not state[1]:
+        return None, False, None, None
+    return state
+
+
+def get_media_state(uid, show_offline, user=None):
+    """
+    get_trakt_media_info through media_states, so the last good state is
+    served while Trakt or TMDB is slow or failing.
+    Returns ((item, is_now_playing, progress_ms, duration_ms), stale).
+    """
+
+    def load():
+        failures = set()
+        state = get_trakt_media_info(uid, True, user=user, failures=failures)
+        return state, not failures
+
+    state, stale = media_states.get(uid, load)
+    return visible_state(state, show_offline), stale
+
+
+def get_recent_history(uid, limit=5, poster_size=None, embed_posters=True, user=None):
+    """
+    get_watch_history with the Trakt fetch going through recent_histories, so
+    the last good history is served while Trakt is slow or failing. Posters
+    are resolved afterwards under their own RECENTS_POSTER_DEADLINE, so a
+    slow poster never makes the history stale. Returns (history, stale).
+    """
+
+    def load():
+        failures = set()
+        history = fetch_watch_history(uid, limit, user=user, failures=failures)
+        return history, not failures
+
+    history, stale = recent_histories.get((uid, limit), load)
+    return process_watch_history(history, poster_size, embed_posters), stale
+
+
+def load_recent_poster(tmdb_id, media_type, size=None, embed=True):
+    """
+    Resolve a history item's poster URL and return it with its base64 image.
+    With embed=False only the URL is resolved and no image is downloaded.
+    """
+    poster_url = trakt.get_tmdb_poster(tmdb_id, media_type)
+    if not poster_url or not embed:
+        return poster_url, None
+    return poster_url, load_image_b64(poster_url, size) or None
+
+
+def get_watch_history(
+    uid, limit=5, poster_size=None, embed_posters=True, user=None, failures=None
+):
     """
     Fetch recent watch history for a user.
     Returns a list of processed history items with title, info, and poster.
+    Posters are only embedded as base64 when embed_posters is set.
+    user is the request's tokens.UserContext, shared with get_current_playback.
+    A failing Trakt returns [] and adds "trakt" to the failures set, if given.
     """
-    doc_ref = db.collection("users").document(uid)
-    doc = doc_ref.get()
+    history = fetch_watch_history(uid, limit, user=user, failures=failures)
+    return process_watch_history(history, poster_size, embed_posters)
 
-    if not doc.exists:
-        return []
 
-    token_info = doc.to_dict()
-    access_token = token_info.get("access_token")
+def fetch_watch_history(uid, limit=5, user=None, failures=None):
+    """
+    Raw Trakt watch history for a user, or [] without a usable token.
+    A failing Trakt returns [] and adds "trakt" to the failures set, if given.
+    """
+    if user is None:
+        user = tokens.UserContext(db, uid)
+    access_token = user.access_token()
 
     if not access_token:
         return []
 
     # Fetch history from Trakt
-    history = trakt.get_watch_history(access_token, limit=limit)
-    
+    try:
+        history = trakt.get_watch_history(access_token, limit=limit)
+    except trakt.TraktAuthError:
+        user.invalidate()
+        return []
+    except trakt.UpstreamError as e:
+        print(f"Trakt unavailable: {e}")
+        if failures is not None:
+            failures.add("trakt")
+        return []
+    return history
+
+
+def process_watch_history(history, poster_size=None, embed_posters=True):
+    """
+    Turn raw Trakt history into items with title, info and poster, loading
+    posters in parallel for at most RECENTS_POSTER_DEADLINE seconds.
+    """
     processed_history = []
+    poster_futures = []
     for item in history:
         item_type = item.get("type", "movie")
         watched_at = item.get("watched_at", "")
@@ -435,9 +746,8 @@ def get_watch_history(uid, limit=5):
                 title = f"{title} - {ep_title}"
             info = show_title
             
-            # Get poster
             tmdb_id = show.get("ids", {}).get("tmdb")
-            poster_url = trakt.get_tmdb_poster(tmdb_id, "tv") if tmdb_id else None
+            media_type = "tv"
             
         elif item_type == "movie":
             movie = item.get("movie", {})
@@ -445,81 +755,131 @@ def get_watch_history(uid, limit=5):
             year = movie.get("year", "")
             info = f"{year}" if year else "Movie"
             
-            # Get poster
             tmdb_id = movie.get("ids", {}).get("tmdb")
-            poster_url = trakt.get_tmdb_poster(tmdb_id, "movie") if tmdb_id else None
+            media_type = "movie"
         else:
             continue
         
-        # Convert poster URL to base64 for embedding in SVG
-        poster_b64 = None
-        if poster_url:
-            try:
-                poster_b64 = load_image_b64(poster_url)
-            except Exception as e:
-                print(f"Error loading recent poster: {e}")
-                poster_b64 = None
-        
+        # Resolve and download posters in parallel, bounded by the pool size
+        future = None
+        if tmdb_id:
+            future = poster_executor.submit(
+                load_recent_poster, tmdb_id, media_type, poster_size, embed_posters
+            )
+        poster_futures.append(future)
+
         processed_history.append({
             "title": title,
             "info": info,
-            "poster_url": poster_url,
-            "poster_b64": poster_b64,
+            "poster_url": None,
+            "poster_b64": None,
             "type": item_type,
             "watched_at": watched_at,
         })
+
+    # Posters that miss the deadline are left empty so the template renders
+    # its placeholder; they keep downloading and warm the cache for next time
+    pending = [f for f in poster_futures if f is not None]
+    wait(pending, timeout=RECENTS_POSTER_DEADLINE)
+
+    for entry, future in zip(processed_history, poster_futures):
+        if future is None or not future.done():
+            continue
+        try:
+            entry["poster_url"], entry["poster_b64"] = future.result()
+            if entry["poster_b64"]:
+                entry["poster_mime"] = img_b64_mime(entry["poster_b64"])
+        except Exception as e:
+            print(f"Error loading recent poster: {e}")
     
     return processed_history
 
 
-@app.route("/", defaults={"path": ""})
-@app.route("/<path:path>")
-def catch_all(path):
-    uid = request.args.get("uid")
-    cover_image = request.args.get("cover_image", default="true") == "true"
-    is_redirect = request.args.get("redirect", default="false") == "true"
-    theme = request.args.get("theme", default="default")
-    bar_color = request.args.get("bar_color", default="53b14f")
-    background_color = request.args.get("background_color", default="121212")
-    is_bar_color_from_cover = (
-        request.args.get("bar_color_cover", default="false") == "true"
+def parse_view_params(args):
+    """
+    Parse /api/view query parameters into a dict with defaults applied.
+    The result is canonical, so it can be used as part of a cache key.
+    """
+    return {
+        "cover_image": args.get("cover_image", default="true") == "true",
+        "theme": args.get("theme", default="default"),
+        "bar_color": args.get("bar_color", default="53b14f"),
+        "background_color": args.get("background_color", default="121212"),
+        "bar_color_cover": args.get("bar_color_cover", default="false") == "true",
+        "show_offline": args.get("show_offline", default="false") == "true",
+        "interchange": args.get("interchange", default="false") == "true",
+        "mode": args.get("mode", default="light"),
+        "profanity": args.get("profanity", default="false") == "true",
+        "show_recents": args.get("show_recents", default="false") == "true",
+        "recents_limit": int(args.get("recents_limit", default="5")),
+    }
+
+
+def state_fingerprint(item, is_now_playing, progress_ms, duration_ms, recents):
+    """Hash of everything fetched from upstream that affects the rendered card"""
+    recents_state = [
+        (
+            r.get("type"),
+            r.get("title"),
+            r.get("info"),
+            r.get("watched_at"),
+            r.get("poster_url"),
+            bool(r.get("poster_b64")),
+        )
+        for r in recents
+    ]
+    payload = json.dumps(
+        [item, is_now_playing, progress_ms, duration_ms, recents_state],
+        sort_keys=True,
+        default=str,
     )
-    show_offline = request.args.get("show_offline", default="false") == "true"
-    interchange = request.args.get("interchange", default="false") == "true"
-    mode = request.args.get("mode", default="light")
-    is_enable_profanity = request.args.get("profanity", default="false") == "true"
-    show_recents = request.args.get("show_recents", default="false") == "true"
-    recents_limit = int(request.args.get("recents_limit", default="5"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
 
-    # Handle invalid request
-    if not uid:
-        return Response("not ok")
 
-    # Fetch recent watch history if enabled
-    recents = []
-    if show_recents:
-        try:
-            recents = get_watch_history(uid, limit=recents_limit)
-        except Exception:
-            recents = []
+def get_cover_url(item):
+    """Return the cover image URL of a now-playing item, or None"""
+    currently_playing_type = item.get("currently_playing_type", "track")
 
     try:
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.info(f"Fetching Trakt media info for uid: {uid}, show_offline: {show_offline}")
-        
-        item, is_now_playing, progress_ms, duration_ms = get_trakt_media_info(
-            uid, show_offline
-        )
-        
-        logger.info(f"Trakt result - item: {item is not None}, is_now_playing: {is_now_playing}")
-    except Exception as e:
-        import traceback
-        logger.error(f"Exception in get_trakt_media_info: {e}")
-        logger.error(f"Traceback: {traceback.format_exc()}")
-        return Response(
-            f"Error: Invalid Trakt access_token or refresh_token. {str(e)}. Please re-login at /api/login"
-        )
+        if currently_playing_type == "track":
+            return item["album"]["images"][1]["url"]
+        elif currently_playing_type == "episode":
+            images = item.get("images", [])
+            if len(images) > 1 and images[1].get("url"):
+                return images[1]["url"]
+        elif currently_playing_type == "movie":
+            images = item.get("album", {}).get("images", [])
+            if len(images) > 1 and images[1].get("url"):
+                return images[1]["url"]
+    except (KeyError, IndexError, TypeError) as e:
+        print(f"Error loading cover image: {e}")
+    return None
+
+
+def render_view_svg(
+    item,
+    is_now_playing,
+    progress_ms,
+    duration_ms,
+    recents,
+    params,
+    img=None,
+    cover_url=None,
+):
+    """
+    Render the card for an already fetched playback state.
+    img is the raw cover image downloaded from cover_url, only used when
+    params["cover_image"] is set.
+    """
+    cover_image = params["cover_image"]
+    theme = params["theme"]
+    bar_color = params["bar_color"]
+    background_color = params["background_color"]
+    is_bar_color_from_cover = params["bar_color_cover"]
+    show_offline = params["show_offline"]
+    interchange = params["interchange"]
+    mode = params["mode"]
+    is_enable_profanity = params["profanity"]
 
     if (show_offline and not is_now_playing) or (item is None):
         if interchange:
@@ -530,7 +890,7 @@ def catch_all(path):
             media_title = "Currently not playing on Stremio"
         img_b64 = ""
         cover_image = False
-        svg = make_svg(
+        return make_svg(
             media_info,
             media_title,
             img_b64,
@@ -545,39 +905,23 @@ def catch_all(path):
             duration_ms,
             recents,
         )
-        resp = Response(svg, mimetype="image/svg+xml")
-        resp.headers["Cache-Control"] = "no-cache, no-store, must-revalidate, s-maxage=1"
-        resp.headers["Pragma"] = "no-cache"
-        resp.headers["Expires"] = "0"
-        return resp
 
     currently_playing_type = item.get("currently_playing_type", "track")
 
-    if is_redirect:
-        return redirect(item["uri"], code=302)
-
-    img = None
     img_b64 = ""
-    if cover_image:
-
-        try:
-            if currently_playing_type == "track":
-                img = load_image(item["album"]["images"][1]["url"])
-            elif currently_playing_type == "episode":
-                images = item.get("images", [])
-                if len(images) > 1 and images[1].get("url"):
-                    img = load_image(images[1]["url"])
-            elif currently_playing_type == "movie":
-                images = item.get("album", {}).get("images", [])
-                if len(images) > 1 and images[1].get("url"):
-                    img = load_image(images[1]["url"])
-        except (KeyError, IndexError, TypeError) as e:
-            print(f"Error loading cover image: {e}")
-            img = None
-
-        # Only convert to base64 if image was successfully loaded
-        if img is not None:
-            img_b64 = to_img_b64(img)
+    img_mime = "image/jpeg"
+    if not cover_image:
+        img = None
+    elif img is not None:
+        # Only convert to base64 if image was successfully loaded, embedding
+        # a copy sized for the theme
+        size = get_image_size(theme, "cover")
+        if cover_url:
+            img_embed = load_image_sized(cover_url, size) or img
+        else:
+            img_embed = images.process_image(img, size) or img
+        img_b64 = to_img_b64(img_embed)
+        img_mime = images.image_mime(img_embed)
 
     # Extract cover image color
     if is_bar_color_from_cover and img is not None:
@@ -586,25 +930,7 @@ def catch_all(path):
         if theme in ["default"]:
             is_skip_dark = True
 
-        try:
-            pil_img = Image.open(io.BytesIO(img))
-            colors = colorgram.extract(pil_img, 5)
-        except Exception as e:
-            print(f"Error extracting colors from image: {e}")
-            colors = []
-
-        for color in colors:
-
-            rgb = color.rgb
-
-            light_or_dark = isLightOrDark([rgb.r, rgb.g, rgb.b], threshold=80)
-
-            if light_or_dark == "dark" and is_skip_dark:
-                # Skip to use bar in dark color
-                continue
-
-            bar_color = "%02x%02x%02x" % (rgb.r, rgb.g, rgb.b)
-            break
+        bar_color = pick_bar_color(get_palette(img), is_skip_dark) or bar_color
 
     # Find media_info and media_title
     if currently_playing_type == "track":
@@ -635,7 +961,7 @@ def catch_all(path):
         media_info = media_title
         media_title = x
 
-    svg = make_svg(
+    return make_svg(
         media_info,
         media_title,
         img_b64,
@@ -649,21 +975,381 @@ def catch_all(path):
         progress_ms,
         duration_ms,
         recents,
+        img_mime=img_mime,
     )
 
+
+def svg_response(svg, etag, is_now_playing, stale=False):
+    """
+    Build the SVG response with a strong ETag, answering 304 when it matches.
+    Now-playing and stale cards must always revalidate; idle cards may be
+    cached briefly. Stale cards are marked with an X-Stale header.
+    """
     resp = Response(svg, mimetype="image/svg+xml")
-    resp.headers["Cache-Control"] = "no-cache, no-store, must-revalidate, s-maxage=1"
-    resp.headers["Pragma"] = "no-cache"
-    resp.headers["Expires"] = "0"
+    resp.set_etag(etag)
+    if stale:
+        resp.headers["X-Stale"] = "true"
+
+    if is_now_playing or stale or SVG_IDLE_MAX_AGE <= 0:
+        resp.headers["Cache-Control"] = "no-cache, must-revalidate, s-maxage=1"
+        resp.headers["Pragma"] = "no-cache"
+        resp.headers["Expires"] = "0"
+    else:
+        resp.headers["Cache-Control"] = (
+            f"public, max-age={SVG_IDLE_MAX_AGE}, "
+            f"stale-while-revalidate={SVG_STALE_WHILE_REVALIDATE}"
+        )
+
+    return resp.make_conditional(request)
+
+
+def render_view_cached(uid, state, recents, params, cover_future=None, cover_url=None):
+    """
+    Render the card for a fetched state through svg_cache.
+    state is the (item, is_now_playing, progress_ms, duration_ms) tuple from
+    get_trakt_media_info. Returns (svg_bytes, etag).
+    """
+    # Identical state and params always render the same SVG
+    cache_key = (
+        uid,
+        state_fingerprint(*state, recents),
+        tuple(sorted(params.items())),
+    )
+    cached = svg_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    img = future_result(cover_future)
+    svg = render_view_svg(*state, recents, params, img, cover_url).encode("utf-8")
+    etag = hashlib.sha1(svg).hexdigest()
+    svg_cache.set(cache_key, (svg, etag))
+    return svg, etag
+
+
+@app.route("/metrics", endpoint="metrics")
+def metrics_endpoint():
+    """Prometheus metrics, summed over all gunicorn workers in multiprocess mode"""
+    body, content_type = metrics.render_metrics()
+    return Response(body, content_type=content_type)
+
+
+@app.route("/", defaults={"path": ""})
+@app.route("/<path:path>")
+def catch_all(path):
+    uid = request.args.get("uid")
+    is_redirect = request.args.get("redirect", default="false") == "true"
+    params = parse_view_params(request.args)
+    show_offline = params["show_offline"]
+
+    # Handle invalid request
+    if not uid:
+        return Response("not ok")
 
+    # Fetch recent watch history in the background while the current
+    # playback, TMDB metadata and cover image are resolved; both share one
+    # Firestore read and token refresh
+    user = tokens.UserContext(db, uid)
+    recents_future = None
+    if params["show_recents"]:
+        recents_future = executor.submit(
+            get_recent_history,
+            uid,
+            params["recents_limit"],
+            get_image_size(params["theme"], "recent"),
+            user=user,
+        )
+
+    try:
+        import logging
+        logger = logging.getLogger(__name__)
+        logger.info(f"Fetching Trakt media info for uid: {uid}, show_offline: {show_offline}")
+        
+        (item, is_now_playing, progress_ms, duration_ms), stale = get_media_state(
+            uid, show_offline, user=user
+        )
+        
+        logger.info(f"Trakt result - item: {item is not None}, is_now_playing: {is_now_playing}")
+    except Exception as e:
+        import traceback
+        logger.error(f"Exception in get_trakt_media_info: {e}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        return Response(
+            f"Error: Invalid Trakt access_token or refresh_token. {str(e)}. Please re-login at /api/login"
+        )
+
+    is_offline = (show_offline and not is_now_playing) or (item is None)
+
+    if is_redirect and not is_offline:
+        if recents_future is not None:
+            recents_future.cancel()
+        return redirect(item["uri"], code=302)
+
+    # Start the cover download while recents are still being fetched
+    cover_future = None
+    cover_url = None
+    if params["cover_image"] and not is_offline:
+        cover_url = get_cover_url(item)
+        if cover_url:
+            cover_future = executor.submit(load_image, cover_url)
+
+    recents, recents_stale = future_result(recents_future, ([], False))
+
+    svg, etag = render_view_cached(
+        uid,
+        (item, is_now_playing, progress_ms, duration_ms),
+        recents,
+        params,
+        cover_future,
+        cover_url,
+    )
+    return svg_response(svg, etag, is_now_playing, stale or recents_stale)
+
+
+def describe_widget_item(item, is_now_playing, show_offline):
+    """
+    Plain-text fields shown by the widget for a playback state, shared by the
+    server-rendered page and the /now JSON.
+    """
+    offline = {
+        "type": "offline",
+        "status": "Offline",
+        "title": "Nothing Playing",
+        "info": "Open Stremio to start watching",
+        "meta": "",
+        "poster_url": None,
+    }
+    if item is None or (not is_now_playing and not show_offline):
+        return offline
+
+    currently_playing_type = item.get("currently_playing_type", "track")
+    watching = "Now Watching" if is_now_playing else "Recently Watched"
+
+    if currently_playing_type == "offline":
+        return offline
+    elif currently_playing_type == "episode":
+        images = item.get("images", [])
+        return {
+            "type": "episode",
+            "status": watching,
+            "title": item.get("name", ""),
+            "info": item.get("show", {}).get("publisher", ""),
+            "meta": "TV Show",
+            "poster_url": images[0].get("url") if images else None,
+        }
+    elif currently_playing_type == "movie":
+        images = item.get("album", {}).get("images", [])
+        return {
+            "type": "movie",
+            "status": watching,
+            "title": item.get("name", ""),
+            "info": item.get("artists", [{}])[0].get("name", "Movie"),
+            "meta": "Movie",
+            "poster_url": images[0].get("url") if images else None,
+        }
+
+    return {
+        "type": currently_playing_type,
+        "status": "Now Playing" if is_now_playing else "Recently Played",
+        "title": item.get("name", "Unknown"),
+        "info": "",
+        "meta": "",
+        "poster_url": None,
+    }
+
+
+def parse_batch_spec(spec):
+    """Validate one batch spec and return (uid, params)"""
+    if not isinstance(spec, dict) or not spec.get("uid"):
+        raise ValueError("each spec needs a uid")
+
+    raw = spec.get("params") or {}
+    if not isinstance(raw, dict):
+        raise ValueError("params must be an object")
+
+    # Accept JSON booleans and numbers as well as query-string values
+    args = MultiDict(
+        (key, str(value).lower() if isinstance(value, bool) else str(value))
+        for key, value in raw.items()
+    )
+    return str(spec["uid"]), parse_view_params(args)
+
+
+def render_batch(specs):
+    """
+    Render every (uid, params) spec, fetching each upstream resource once:
+    playback per uid, recents per uid and poster size, covers per URL.
+    Returns one result dict per spec, in order.
+    """
+    parsed = []
+    for spec in specs:
+        try:
+            parsed.append(parse_batch_spec(spec))
+        except ValueError as e:
+            parsed.append(e)
+
+    valid = [p for p in parsed if not isinstance(p, Exception)]
+
+    # Recents for each (uid, poster size), at the largest limit asked for
+    recents_limits = {}
+    for uid, params in valid:
+        if params["show_recents"]:
+            key = (uid, get_image_size(params["theme"], "recent"))
+            recents_limits[key] = max(recents_limits.get(key, 0), params["recents_limit"])
+    # One Firestore read and token refresh per uid for the whole batch
+    users = {uid: tokens.UserContext(db, uid) for uid, _ in valid}
+    recents_futures = {
+        key: executor.submit(
+            get_recent_history, key[0], limit, key[1], user=users[key[0]]
+        )
+        for key, limit in recents_limits.items()
+    }
+
+    # One state per uid; cards that hide offline status filter it below
+    state_futures = {
+        uid: executor.submit(get_media_state, uid, True, users[uid])
+        for uid in users
+    }
+
+    cover_futures = {}
+    results = []
+    for entry in parsed:
+        if isinstance(entry, Exception):
+            results.append({"status": 400, "error": str(entry)})
+            continue
+
+        uid, params = entry
+        try:
+            state, stale = state_futures[uid].result()
+            state = visible_state(state, params["show_offline"])
+
+            item, is_now_playing = state[0], state[1]
+            is_offline = (params["show_offline"] and not is_now_playing) or (
+                item is None
+            )
+            cover_url = None
+            if params["cover_image"] and not is_offline:
+                cover_url = get_cover_url(item)
+                if cover_url and cover_url not in cover_futures:
+                    cover_futures[cover_url] = executor.submit(load_image, cover_url)
+
+            recents = []
+            if params["show_recents"]:
+                recents_key = (uid, get_image_size(params["theme"], "recent"))
+                recents, recents_stale = future_result(
+                    recents_futures[recents_key], ([], False)
+                )
+                recents = recents[: params["recents_limit"]]
+                stale = stale or recents_stale
+
+            svg, etag = render_view_cached(
+                uid,
+                state,
+                recents,
+                params,
+                cover_futures.get(cover_url),
+                cover_url,
+            )
+        except Exception as e:
+            print(f"Error rendering batch spec for {uid}: {e}")
+            results.append(
+                {"uid": uid, "params": params, "status": 500, "error": str(e)}
+            )
+            continue
+
+        results.append(
+            {
+                "uid": uid,
+                "params": params,
+                "status": 200,
+                "etag": etag,
+                "is_now_playing": is_now_playing,
+                "stale": stale,
+                "svg": svg,
+            }
+        )
+
+    return results
+
+
+def batch_multipart_response(results):
+    """multipart/mixed response with one part per result, in spec order"""
+    boundary = f"batch-{uuid.uuid4().hex}"
+    chunks = []
+    for index, result in enumerate(results):
+        if result["status"] == 200:
+            headers = [
+                "Content-Type: image/svg+xml",
+                f'ETag: "{result["etag"]}"',
+            ]
+            if result["stale"]:
+                headers.append("X-Stale: true")
+            body = result["svg"]
+        else:
+            headers = ["Content-Type: text/plain; charset=utf-8"]
+            body = result["error"].encode("utf-8")
+        headers += [f"Content-ID: <{index}>", f"X-Status: {result['status']}"]
+        part_head = "".join(f"{header}\r\n" for header in headers)
+        chunks.append(f"--{boundary}\r\n{part_head}\r\n".encode("utf-8"))
+        chunks.append(body)
+        chunks.append(b"\r\n")
+    chunks.append(f"--{boundary}--\r\n".encode("utf-8"))
+
+    return Response(
+        b"".join(chunks), mimetype=f"multipart/mixed; boundary={boundary}"
+    )
+
+
+@app.route("/batch", methods=["POST"])
+def batch():
+    """
+    Render several cards in one request. The JSON body is
+    {"specs": [{"uid": ..., "params": {...}}, ...]} with the same params as
+    /api/view. Returns JSON, or multipart/mixed with format=multipart or a
+    matching Accept header.
+    """
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return Response("Missing specs", status=400)
+    specs = body.get("specs")
+    if not isinstance(specs, list) or not specs:
+        return Response("Missing specs", status=400)
+    if len(specs) > BATCH_MAX_SPECS:
+        return Response(f"At most {BATCH_MAX_SPECS} specs per batch", status=400)
+
+    results = render_batch(specs)
+
+    fmt = request.args.get("format") or body.get("format")
+    if fmt is None and request.accept_mimetypes.best == "multipart/mixed":
+        fmt = "multipart"
+    if fmt == "multipart":
+        resp = batch_multipart_response(results)
+    else:
+        for result in results:
+            if "svg" in result:
+                result["svg"] = result["svg"].decode("utf-8")
+        resp = Response(
+            json.dumps({"results": results}, separators=(",", ":")),
+            mimetype="application/json",
+        )
+
+    resp.headers["Cache-Control"] = "no-cache"
+    if any(result.get("stale") for result in results):
+        resp.headers["X-Stale"] = "true"
     return resp
 
 
+def parse_refresh_interval(args):
+    """The widget's refresh parameter, clamped between 10 and 300 seconds"""
+    return max(10, min(300, int(args.get("refresh", default="30"))))
+
+
 @app.route("/widget")
 def widget():
     """
     HTML widget endpoint for embedding on websites via iframe.
-    Auto-refreshes every 30 seconds for real-time updates.
+    Reloads when /widget/events reports a playback change, falling back to
+    refreshing every `refresh` seconds without EventSource support.
+    With render=client the page instead polls /now and updates itself.
     """
     uid = request.args.get("uid")
     cover_image = request.args.get("cover_image", default="true") == "true"
@@ -671,101 +1357,222 @@ def widget():
     background_color = request.args.get("background_color", default="121212")
     show_offline = request.args.get("show_offline", default="true") == "true"
     mode = request.args.get("mode", default="dark")
-    refresh_interval = int(request.args.get("refresh", default="30"))
+    refresh_interval = parse_refresh_interval(request.args)
     show_recents = request.args.get("show_recents", default="false") == "true"
     recents_limit = int(request.args.get("recents_limit", default="3"))
-
-    # Clamp refresh interval between 10 and 300 seconds
-    refresh_interval = max(10, min(300, refresh_interval))
+    client_render = request.args.get("render", default="server") == "client"
 
     if not uid:
         return Response("Missing uid parameter", status=400)
 
-    # Fetch recent watch history if enabled
-    recents = []
+    # Fetch recent watch history in the background
+    user = tokens.UserContext(db, uid)
+    recents_future = None
     if show_recents:
-        try:
-            recents = get_watch_history(uid, limit=recents_limit)
-        except Exception:
-            recents = []
+        recents_future = executor.submit(
+            get_recent_history,
+            uid,
+            recents_limit,
+            get_image_size("widget", "recent"),
+            not client_render,
+            user=user,
+        )
 
     try:
-        item, is_now_playing, progress_ms, duration_ms = get_trakt_media_info(
-            uid, show_offline
+        (item, is_now_playing, progress_ms, duration_ms), stale = get_media_state(
+            uid, show_offline, user=user
         )
     except Exception as e:
+        if recents_future is not None:
+            recents_future.cancel()
         return Response(f"Error fetching data: {str(e)}", status=500)
 
-    # Determine display content
-    if item is None or (not is_now_playing and not show_offline):
-        media_title = "Nothing Playing"
-        media_info = "Open Stremio to start watching"
-        status_text = "Offline"
-        img_b64 = ""
-        meta_info = ""
+    # Identifies the rendered playback state; the page only reloads when the
+    # event stream reports a different one
+    state_id = state_fingerprint(item, is_now_playing, progress_ms, duration_ms, [])
+    base_path = request.path.rstrip("/")
+    query = request.query_string.decode()
+    # Relative, so they resolve under whatever prefix the page is served at
+    # (/api/widget behind nginx and on Vercel, /widget on the bare service)
+    if request.path.endswith("/"):
+        events_url = f"events?{query}"
+        now_url = f"../now?{query}"
     else:
-        currently_playing_type = item.get("currently_playing_type", "track")
-        
-        if currently_playing_type == "offline":
-            media_title = "Nothing Playing"
-            media_info = "Open Stremio to start watching"
-            status_text = "Offline"
-            img_b64 = ""
-            meta_info = ""
-        elif currently_playing_type == "episode":
-            media_title = item.get("name", "")
-            media_info = item.get("show", {}).get("publisher", "")
-            status_text = "Now Watching" if is_now_playing else "Recently Watched"
-            meta_info = "TV Show"
-            # Load poster
-            images = item.get("images", [])
-            if cover_image and len(images) > 0 and images[0].get("url"):
-                img_b64 = load_image_b64(images[0]["url"])
-            else:
-                img_b64 = ""
-        elif currently_playing_type == "movie":
-            media_title = item.get("name", "")
-            media_info = item.get("artists", [{}])[0].get("name", "Movie")
-            status_text = "Now Watching" if is_now_playing else "Recently Watched"
-            meta_info = "Movie"
-            # Load poster
-            images = item.get("album", {}).get("images", [])
-            if cover_image and len(images) > 0 and images[0].get("url"):
-                img_b64 = load_image_b64(images[0]["url"])
-            else:
-                img_b64 = ""
-        else:
-            media_title = item.get("name", "Unknown")
-            media_info = ""
-            status_text = "Now Playing" if is_now_playing else "Recently Played"
-            img_b64 = ""
-            meta_info = ""
+        events_url = f"{base_path.rsplit('/', 1)[-1]}/events?{query}"
+        now_url = f"now?{query}"
 
-    # Sanitize for HTML
-    media_title = encode_html_entities(media_title)
-    media_info = encode_html_entities(media_info)
+    content = describe_widget_item(item, is_now_playing, show_offline)
 
-    html_content = render_template(
-        "widget.html.j2",
-        media_title=media_title,
-        media_info=media_info,
-        status_text=status_text,
-        meta_info=meta_info,
-        img=img_b64,
-        cover_image=cover_image,
-        is_now_playing=is_now_playing,
-        bar_color=bar_color,
-        background_color=background_color,
-        mode=mode,
-        refresh_interval=refresh_interval,
-        recents=recents,
-    )
+    # Client mode links posters instead of embedding them; the browser then
+    # keeps the page current from the small /now JSON
+    img_b64 = ""
+    if cover_image and content["poster_url"] and not client_render:
+        img_b64 = load_image_b64(content["poster_url"], get_image_size("widget", "cover"))
+
+    # Sanitize for HTML
+    media_title = encode_html_entities(content["title"])
+    media_info = encode_html_entities(content["info"])
+
+    recents, recents_stale = future_result(recents_future, ([], False))
+
+    with metrics.stage("render"):
+        html_content = render_template(
+            "widget.html.j2",
+            media_title=media_title,
+            media_info=media_info,
+            status_text=content["status"],
+            meta_info=content["meta"],
+            img=img_b64,
+            poster_url=content["poster_url"] if client_render else None,
+            img_mime=img_b64_mime(img_b64),
+            cover_image=cover_image,
+            is_now_playing=is_now_playing,
+            bar_color=bar_color,
+            background_color=background_color,
+            mode=mode,
+            refresh_interval=refresh_interval,
+            recents=recents,
+            state_id=state_id,
+            events_url=events_url,
+            client_render=client_render,
+            now_url=now_url,
+        )
 
     resp = Response(html_content, mimetype="text/html")
     resp.headers["Cache-Control"] = "no-cache, no-store, must-revalidate, max-age=0"
     resp.headers["X-Frame-Options"] = "ALLOWALL"
     resp.headers["Access-Control-Allow-Origin"] = "*"
+    if stale or recents_stale:
+        resp.headers["X-Stale"] = "true"
+
+    return resp
+
+
+
+@app.route("/now")
+def now_playing():
+    """
+    Compact JSON of the widget state for client-side rendering. Posters are
+    returned as URLs, and a strong ETag lets pollers revalidate with 304s.
+    """
+    uid = request.args.get("uid")
+    show_offline = request.args.get("show_offline", default="true") == "true"
+    show_recents = request.args.get("show_recents", default="false") == "true"
+    try:
+        recents_limit = int(request.args.get("recents_limit", default="3"))
+    except ValueError:
+        return Response("recents_limit must be an integer", status=400)
+    recents_limit = max(1, min(NOW_MAX_RECENTS, recents_limit))
+
+    if not uid:
+        return Response("Missing uid parameter", status=400)
+
+    user = tokens.UserContext(db, uid)
+    recents_future = None
+    if show_recents:
+        recents_future = executor.submit(
+            get_recent_history, uid, recents_limit, None, False, user=user
+        )
+
+    try:
+        (item, is_now_playing, progress_ms, duration_ms), stale = get_media_state(
+            uid, show_offline, user=user
+        )
+    except Exception as e:
+        if recents_future is not None:
+            recents_future.cancel()
+        return Response(f"Error fetching data: {str(e)}", status=500)
+
+    payload = describe_widget_item(item, is_now_playing, show_offline)
+    payload["is_now_playing"] = is_now_playing
+    payload["state"] = state_fingerprint(
+        item, is_now_playing, progress_ms, duration_ms, []
+    )
+    recents, recents_stale = future_result(recents_future, ([], False))
+    payload["recents"] = [
+        {
+            "type": r.get("type"),
+            "title": r.get("title"),
+            "info": r.get("info"),
+            "poster_url": r.get("poster_url"),
+            "watched_at": r.get("watched_at"),
+        }
+        for r in recents
+    ]
+    payload["stale"] = stale or recents_stale
+
+    body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode(
+        "utf-8"
+    )
+    resp = Response(body, mimetype="application/json")
+    resp.set_etag(hashlib.sha1(body).hexdigest())
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["Access-Control-Allow-Origin"] = "*"
+    if payload["stale"]:
+        resp.headers["X-Stale"] = "true"
+    return resp.make_conditional(request)
+
+
+@app.route("/widget/events")
+def widget_events():
+    """
+    Server-Sent Events stream for the widget. Emits a `state` event with the
+    playback state id whenever it differs from the one the page rendered,
+    and keep-alive comments otherwise. Streams end after
+    WIDGET_STREAM_DURATION seconds and the browser reconnects on its own.
+    State is checked at most once per widget refresh interval, and streams
+    of the same uid share each check. Beyond WIDGET_STREAM_MAX_CONNECTIONS
+    open streams the request gets a 503 and the page falls back to reloading.
+    """
+    uid = request.args.get("uid")
+    show_offline = request.args.get("show_offline", default="true") == "true"
+    rendered_state = request.args.get("state")
+    poll_interval = max(WIDGET_STREAM_POLL_INTERVAL, parse_refresh_interval(request.args))
+
+    if not uid:
+        return Response("Missing uid parameter", status=400)
+
+    if not _widget_streams.acquire(blocking=False):
+        resp = Response("Too many open widget streams", status=503)
+        resp.headers["Retry-After"] = str(int(poll_interval))
+        return resp
+
+    def current_state():
+        key = (uid, show_offline)
+        state = widget_stream_states.get(key)
+        if state is None:
+            (item, is_now_playing, progress_ms, duration_ms), _ = get_media_state(
+                uid, show_offline
+            )
+            state = state_fingerprint(item, is_now_playing, progress_ms, duration_ms, [])
+            widget_stream_states.set(key, state, ttl=poll_interval)
+        return state
 
+    def stream():
+        last_state = rendered_state
+        deadline = time() + WIDGET_STREAM_DURATION
+        yield f"retry: {WIDGET_STREAM_RETRY_MS}\n\n"
+
+        while time() < deadline:
+            try:
+                state = current_state()
+            except Exception as e:
+                print(f"Error checking widget state: {e}")
+                state = None
+
+            if state is not None and state != last_state:
+                last_state = state
+                yield f"event: state\ndata: {state}\n\n"
+            else:
+                yield ": keep-alive\n\n"
+
+            sleep(poll_interval)
+
+    resp = Response(stream(), mimetype="text/event-stream")
+    resp.call_on_close(_widget_streams.release)
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"
+    resp.headers["Access-Control-Allow-Origin"] = "*"
     return resp
 
 
@@ -0,0 +1,107 @@
+"""
+Compare the NumPy palette extractor against colorgram on poster fixtures.
+
+    python benchmarks/bench_palette.py [--posters 16] [--repeat 5] [--output result.json]
+
+Reports extraction time per poster for both extractors and how often they
+pick the same bar color (using the default theme's skip-dark rule).
+"""
+import argparse
+import json
+import math
+import os
+import statistics
+import sys
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.fixtures import make_posters
+from util.colors import extract_palette, pick_bar_color
+
+EXTRACTORS = ["colorgram", "numpy"]
+# Bar colors closer than this (RGB euclidean distance) count as agreeing
+AGREEMENT_DISTANCE = 40
+
+
+def hex_to_rgb(value):
+    return tuple(int(value[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def time_extractor(posters, extractor, repeat):
+    timings = []
+    palettes = []
+    for content in posters:
+        best = math.inf
+        for _ in range(repeat):
+            started = perf_counter()
+            palette = extract_palette(content, 5, extractor=extractor)
+            best = min(best, perf_counter() - started)
+        timings.append(best)
+        palettes.append(palette)
+    return timings, palettes
+
+
+def run(num_posters, repeat):
+    posters = make_posters(num_posters)
+    results = {"posters": num_posters, "repeat": repeat, "extractors": {}}
+    palettes = {}
+
+    for extractor in EXTRACTORS:
+        timings, palettes[extractor] = time_extractor(posters, extractor, repeat)
+        results["extractors"][extractor] = {
+            "mean_ms": statistics.mean(timings) * 1000,
+            "p50_ms": statistics.median(timings) * 1000,
+            "max_ms": max(timings) * 1000,
+        }
+
+    distances = []
+    for reference, candidate in zip(palettes["colorgram"], palettes["numpy"]):
+        for is_skip_dark in (True, False):
+            a = pick_bar_color(reference, is_skip_dark)
+            b = pick_bar_color(candidate, is_skip_dark)
+            if a is None or b is None:
+                distances.append(0 if a == b else math.inf)
+                continue
+            distances.append(math.dist(hex_to_rgb(a), hex_to_rgb(b)))
+
+    finite = [d for d in distances if d != math.inf]
+    results["agreement"] = {
+        "within_distance": AGREEMENT_DISTANCE,
+        "ratio": sum(d <= AGREEMENT_DISTANCE for d in distances) / len(distances),
+        "mean_distance": statistics.mean(finite) if finite else None,
+    }
+    results["speedup"] = (
+        results["extractors"]["colorgram"]["mean_ms"]
+        / results["extractors"]["numpy"]["mean_ms"]
+    )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--posters", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(args.posters, args.repeat)
+
+    for name, stats in results["extractors"].items():
+        print(
+            f"{name:>10}: mean {stats['mean_ms']:.2f} ms  "
+            f"p50 {stats['p50_ms']:.2f} ms  max {stats['max_ms']:.2f} ms"
+        )
+    print(f"   speedup: {results['speedup']:.1f}x")
+    print(
+        f" agreement: {results['agreement']['ratio']:.0%} of bar colors within "
+        f"{AGREEMENT_DISTANCE} (mean distance {results['agreement']['mean_distance']:.1f})"
+    )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Offline micro-benchmarks for the pieces of the render pipeline in api/view.py.
+
+    python benchmarks/bench_render.py [--min-time 0.5] [--filter make_svg]
+        [--output result.json] [--baseline previous.json] [--max-regression 0.2]
+
+Every benchmark runs on fixture data only, with no network or Firestore.
+For each one it reports ops/sec, p50/p99 latency and the memory allocated
+by a single call (tracemalloc peak, measured in a separate untimed pass).
+With --baseline the results are compared against an earlier JSON run, and
+the exit status is 1 if any benchmark lost more than --max-regression of
+its ops/sec.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tracemalloc
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+# Use the mock Firestore client, the benchmarks never touch upstream services
+os.environ.setdefault("TESTING", "true")
+
+from api import view
+from benchmarks.fixtures import make_poster
+from util.colors import extract_palette
+from util.profanity import profanity_check
+
+THEMES = sorted(
+    name[len("stremio."):-len(".html.j2")]
+    for name in os.listdir(os.path.join(os.path.dirname(view.__file__), "templates"))
+    if name.startswith("stremio.") and name.endswith(".html.j2")
+)
+
+POSTER = make_poster(0)
+POSTER_B64 = view.to_img_b64(POSTER)
+RECENT_B64 = view.to_img_b64(make_poster(1, size=(64, 96), quality=80))
+
+RECENTS = [
+    {
+        "title": f"S01E0{i} - Episode {i}",
+        "info": "Fixture Show",
+        "poster_url": f"https://image.tmdb.org/t/p/w185/fixture{i}.jpg",
+        "poster_b64": RECENT_B64,
+        "poster_mime": "image/jpeg",
+        "type": "episode",
+        "watched_at": "2024-01-01T00:00:00.000Z",
+    }
+    for i in range(1, 6)
+]
+
+
+def make_svg_case(theme, recents):
+    def run():
+        with view.app.app_context():
+            view.make_svg(
+                "2010 • Action, Science Fiction • 2h 28m",
+                "Inception",
+                POSTER_B64,
+                True,
+                True,
+                theme,
+                "53b14f",
+                False,
+                "121212",
+                "dark",
+                recents=recents,
+            )
+
+    return run
+
+
+def build_cases():
+    cases = {}
+    for theme in THEMES:
+        cases[f"make_svg[{theme}]"] = make_svg_case(theme, None)
+        cases[f"make_svg[{theme},recents]"] = make_svg_case(theme, RECENTS)
+
+    cases["generate_css_bar"] = lambda: view.generate_css_bar(75)
+    cases["to_img_b64"] = lambda: view.to_img_b64(POSTER)
+    cases["calculate_progress_data"] = lambda: view.calculate_progress_data(
+        3_725_000, 8_880_000
+    )
+    cases["palette[colorgram]"] = lambda: extract_palette(
+        POSTER, 5, extractor="colorgram"
+    )
+    cases["palette[numpy]"] = lambda: extract_palette(POSTER, 5, extractor="numpy")
+    cases["profanity_check[clean]"] = lambda: profanity_check(
+        "The Lord of the Rings: The Return of the King"
+    )
+    cases["profanity_check[dirty]"] = lambda: profanity_check("What the hell, damn it")
+    return cases
+
+
+def measure(fn, min_time, min_rounds=20):
+    """Time fn until min_time has passed, then measure one call's allocations"""
+    # Warm up template and regex caches outside the measurement
+    fn()
+
+    timings = []
+    started = perf_counter()
+    while len(timings) < min_rounds or perf_counter() - started < min_time:
+        t0 = perf_counter()
+        fn()
+        timings.append(perf_counter() - t0)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings.sort()
+    p99_index = min(len(timings) - 1, int(len(timings) * 0.99))
+    return {
+        "rounds": len(timings),
+        "ops_per_sec": len(timings) / sum(timings),
+        "p50_us": statistics.median(timings) * 1e6,
+        "p99_us": timings[p99_index] * 1e6,
+        "alloc_peak_kb": peak / 1024,
+    }
+
+
+def run(min_time, name_filter=None):
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "min_time": min_time,
+        "benchmarks": {},
+    }
+    for name, fn in build_cases().items():
+        if name_filter and name_filter not in name:
+            continue
+        results["benchmarks"][name] = measure(fn, min_time)
+    return results
+
+
+def compare(results, baseline, max_regression):
+    """Print the ops/sec change per benchmark; return the names that regressed"""
+    regressed = []
+    print()
+    print(f"{'benchmark':<40} {'baseline':>12} {'current':>12} {'change':>8}")
+    for name, stats in results["benchmarks"].items():
+        before = baseline.get("benchmarks", {}).get(name)
+        if before is None:
+            print(f"{name:<40} {'-':>12} {stats['ops_per_sec']:>12.0f} {'new':>8}")
+            continue
+        change = stats["ops_per_sec"] / before["ops_per_sec"] - 1
+        flag = ""
+        if change < -max_regression:
+            regressed.append(name)
+            flag = "  REGRESSION"
+        print(
+            f"{name:<40} {before['ops_per_sec']:>12.0f} "
+            f"{stats['ops_per_sec']:>12.0f} {change:>+8.1%}{flag}"
+        )
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--min-time", type=float, default=0.5, help="seconds to spend per benchmark"
+    )
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against this earlier JSON run")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.2,
+        help="fail if ops/sec drops by more than this fraction of the baseline",
+    )
+    args = parser.parse_args()
+
+    results = run(args.min_time, args.filter)
+
+    print(
+        f"{'benchmark':<40} {'ops/sec':>12} {'p50 us':>10} {'p99 us':>10} {'alloc KiB':>10}"
+    )
+    for name, stats in results["benchmarks"].items():
+        print(
+            f"{name:<40} {stats['ops_per_sec']:>12.0f} {stats['p50_us']:>10.1f} "
+            f"{stats['p99_us']:>10.1f} {stats['alloc_peak_kb']:>10.1f}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Measure cold-start import time of the service entry points.
+
+    python benchmarks/bench_startup.py [--module api.view --module api.app]
+        [--runs 5] [--top 15] [--output result.json]
+        [--baseline previous.json] [--max-regression 0.25]
+
+Each run imports the module in a fresh interpreter with `python -X importtime`
+and parses the per-module timings it prints. Reports the median cumulative
+import time of the entry point, the slowest modules it pulls in, and any
+heavy dependency that should only load on first use (see LAZY_MODULES).
+With --baseline the entry points are compared against an earlier JSON run,
+and the exit status is 1 if one got slower by more than --max-regression or
+if a lazy dependency is imported at startup.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+# Dependencies that must not be imported until a request needs them
+LAZY_MODULES = [
+    "PIL",
+    "colorgram",
+    "numpy",
+    "firebase_admin",
+    "google.cloud.firestore",
+    "profanityfilter",
+    "requests",
+]
+
+
+def import_times(module):
+    """Import module in a fresh interpreter; return {name: (self_us, cumulative_us)}"""
+    env = dict(os.environ)
+    # Startup must not depend on credentials, so run without them
+    env.pop("FIREBASE", None)
+    env.pop("TESTING", None)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{proc.stderr}")
+
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def measure(module, runs, top):
+    samples = [import_times(module) for _ in range(runs)]
+
+    cumulative = {}
+    for times in samples:
+        for name, (_, cum) in times.items():
+            cumulative.setdefault(name, []).append(cum)
+    medians = {name: statistics.median(values) for name, values in cumulative.items()}
+
+    slowest = sorted(
+        (name for name in medians if name != module),
+        key=medians.get,
+        reverse=True,
+    )[:top]
+    loaded = set(samples[-1])
+    return {
+        "total_ms": medians[module] / 1000,
+        "runs_ms": [times[module][1] / 1000 for times in samples],
+        "slowest": {name: medians[name] / 1000 for name in slowest},
+        "eager_lazy_modules": [
+            name for name in LAZY_MODULES if name in loaded
+        ],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--module",
+        action="append",
+        help="entry point to import (repeatable, default api.view and api.app)",
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against this earlier JSON run")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.25,
+        help="fail if import time grows by more than this fraction of the baseline",
+    )
+    args = parser.parse_args()
+
+    modules = args.module or ["api.view", "api.app"]
+    results = {
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "modules": {module: measure(module, args.runs, args.top) for module in modules},
+    }
+
+    failed = False
+    for module, stats in results["modules"].items():
+        print(f"{module}: {stats['total_ms']:.1f} ms (median of {args.runs})")
+        for name, ms in stats["slowest"].items():
+            print(f"    {ms:8.1f} ms  {name}")
+        if stats["eager_lazy_modules"]:
+            failed = True
+            print(f"    imported at startup: {', '.join(stats['eager_lazy_modules'])}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print()
+        for module, stats in results["modules"].items():
+            before = baseline.get("modules", {}).get(module)
+            if before is None:
+                continue
+            change = stats["total_ms"] / before["total_ms"] - 1
+            flag = ""
+            if change > args.max_regression:
+                failed = True
+                flag = "  REGRESSION"
+            print(
+                f"{module}: {before['total_ms']:.1f} ms -> "
+                f"{stats['total_ms']:.1f} ms ({change:+.1%}){flag}"
+            )
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+In-memory stand-in for the parts of the Firestore client the app uses.
+
+Supports collection().document() get/set/update/delete and the
+where/order_by/limit/start_after/stream queries of the token refresher.
+Every document read is counted, so the load test can report Firestore
+reads per request.
+"""
+import copy
+import threading
+
+_OPERATORS = {
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    "==": lambda a, b: a == b,
+    ">=": lambda a, b: a >= b,
+    ">": lambda a, b: a > b,
+}
+
+
+class FakeSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+
+class FakeDocument:
+    def __init__(self, collection, doc_id):
+        self._collection = collection
+        self.id = doc_id
+
+    def get(self):
+        db = self._collection.db
+        with db.lock:
+            db.reads += 1
+            data = self._collection.docs.get(self.id)
+            return FakeSnapshot(self, copy.deepcopy(data))
+
+    def set(self, data):
+        db = self._collection.db
+        with db.lock:
+            db.writes += 1
+            self._collection.docs[self.id] = copy.deepcopy(data)
+
+    def update(self, data):
+        db = self._collection.db
+        with db.lock:
+            db.writes += 1
+            self._collection.docs.setdefault(self.id, {}).update(copy.deepcopy(data))
+
+    def delete(self):
+        db = self._collection.db
+        with db.lock:
+            db.writes += 1
+            self._collection.docs.pop(self.id, None)
+
+
+class FakeQuery:
+    def __init__(self, collection, filters=(), order=None, limit_to=None, after=None):
+        self._collection = collection
+        self._filters = list(filters)
+        self._order = order
+        self._limit = limit_to
+        self._after = after
+
+    def _copy(self, **changes):
+        state = {
+            "filters": self._filters,
+            "order": self._order,
+            "limit_to": self._limit,
+            "after": self._after,
+        }
+        state.update(changes)
+        return FakeQuery(self._collection, **state)
+
+    def where(self, field, op, value):
+        return self._copy(filters=self._filters + [(field, _OPERATORS[op], value)])
+
+    def order_by(self, field):
+        return self._copy(order=field)
+
+    def limit(self, count):
+        return self._copy(limit_to=count)
+
+    def start_after(self, snapshot):
+        return self._copy(after=snapshot)
+
+    def stream(self):
+        db = self._collection.db
+        with db.lock:
+            items = [
+                (doc_id, copy.deepcopy(data))
+                for doc_id, data in self._collection.docs.items()
+                if all(
+                    field in data and op(data[field], value)
+                    for field, op, value in self._filters
+                )
+            ]
+        if self._order:
+            items.sort(key=lambda item: (item[1].get(self._order), item[0]))
+        if self._after is not None:
+            ids = [doc_id for doc_id, _ in items]
+            if self._after.id in ids:
+                items = items[ids.index(self._after.id) + 1:]
+        if self._limit is not None:
+            items = items[: self._limit]
+
+        with db.lock:
+            db.reads += len(items)
+        for doc_id, data in items:
+            yield FakeSnapshot(self._collection.document(doc_id), data)
+
+
+class FakeCollection(FakeQuery):
+    def __init__(self, db, name):
+        super().__init__(self)
+        self.db = db
+        self.name = name
+        self.docs = {}
+
+    def document(self, doc_id):
+        return FakeDocument(self, doc_id)
+
+
+class FakeFirestore:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reads = 0
+        self.writes = 0
+        self._collections = {}
+
+    def collection(self, name):
+        with self.lock:
+            if name not in self._collections:
+                self._collections[name] = FakeCollection(self, name)
+            return self._collections[name]
@@ -0,0 +1,58 @@
+"""
+Deterministic poster-like fixture images for the offline benchmarks.
+"""
+import io
+import random
+
+from PIL import Image, ImageDraw, ImageFilter
+
+POSTER_SIZE = (300, 450)
+
+# (background, accent, highlight) palettes loosely modelled on real posters
+POSTER_PALETTES = [
+    ((12, 14, 28), (196, 38, 42), (240, 200, 120)),
+    ((230, 224, 210), (30, 60, 110), (200, 80, 40)),
+    ((8, 8, 8), (40, 170, 200), (250, 250, 250)),
+    ((60, 20, 70), (240, 120, 40), (250, 220, 60)),
+    ((20, 50, 30), (120, 180, 60), (230, 230, 200)),
+    ((90, 90, 100), (20, 20, 25), (210, 50, 90)),
+    ((250, 180, 40), (20, 20, 20), (240, 240, 240)),
+    ((14, 30, 60), (90, 140, 220), (255, 255, 255)),
+]
+
+
+def make_poster(seed, size=POSTER_SIZE, fmt="JPEG", quality=90):
+    """Render one fixture poster: gradient background, shapes, title band and noise."""
+    rng = random.Random(seed)
+    background, accent, highlight = POSTER_PALETTES[seed % len(POSTER_PALETTES)]
+    width, height = size
+
+    img = Image.new("RGB", size, background)
+    draw = ImageDraw.Draw(img)
+
+    # Vertical gradient towards the accent color
+    for y in range(height):
+        t = (y / height) ** 2 * 0.6
+        row = tuple(int(b + (a - b) * t) for b, a in zip(background, accent))
+        draw.line([(0, y), (width, y)], fill=row)
+
+    for _ in range(rng.randint(3, 7)):
+        x0, y0 = rng.randint(0, width), rng.randint(0, height)
+        r = rng.randint(20, 120)
+        color = rng.choice([accent, highlight])
+        draw.ellipse([x0 - r, y0 - r, x0 + r, y0 + r], fill=color)
+
+    band_top = int(height * rng.uniform(0.7, 0.85))
+    draw.rectangle([0, band_top, width, band_top + 40], fill=highlight)
+
+    img = img.filter(ImageFilter.GaussianBlur(1.5))
+    noise = Image.effect_noise(size, 18).convert("RGB")
+    img = Image.blend(img, noise, 0.08)
+
+    out = io.BytesIO()
+    img.save(out, format=fmt, quality=quality)
+    return out.getvalue()
+
+
+def make_posters(count=16):
+    return [make_poster(seed) for seed in range(count)]
@@ -0,0 +1,313 @@
+"""
+End-to-end load test of /api/view and /api/widget against local stand-ins.
+
+    python benchmarks/loadtest.py [--users 50] [--concurrency 16] [--duration 20]
+        [--trakt-latency 0.08] [--tmdb-latency 0.05] [--error-rate 0.0]
+        [--mix view=3,widget=1] [--output result.json]
+
+Starts stub Trakt and TMDB servers (benchmarks/stubs.py), points util.trakt
+at them through TRAKT_API_BASE / TMDB_API_BASE / TMDB_IMAGE_BASE, swaps the
+Firestore client for an in-memory fake holding --users linked accounts, and
+serves api/app.py from a threaded WSGI server on localhost. Worker threads
+then request random users and themes for --duration seconds.
+
+Reports throughput, latency percentiles per route, status codes, and
+upstream calls (per stub endpoint and Firestore reads) per request.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import threading
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.fake_firestore import FakeFirestore
+from benchmarks.stubs import TMDBStub, TraktStub
+
+THEMES = [
+    "default",
+    "compact",
+    "karaoke",
+    "apple",
+    "natemoo-re",
+    "novatorem",
+    "stremio-embed",
+]
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("view", "widget"):
+            raise argparse.ArgumentTypeError(f"unknown route {name!r}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    return sorted_values[index]
+
+
+def latency_summary(latencies):
+    latencies = sorted(latencies)
+    return {
+        "count": len(latencies),
+        "mean_ms": statistics.mean(latencies) * 1000 if latencies else None,
+        "p50_ms": percentile(latencies, 0.50) * 1000 if latencies else None,
+        "p90_ms": percentile(latencies, 0.90) * 1000 if latencies else None,
+        "p99_ms": percentile(latencies, 0.99) * 1000 if latencies else None,
+        "max_ms": latencies[-1] * 1000 if latencies else None,
+    }
+
+
+def start_stubs(args):
+    trakt_stub = TraktStub(
+        latency=args.trakt_latency,
+        error_rate=args.trakt_error_rate,
+        rotate=args.rotate,
+        idle_ratio=args.idle_ratio,
+        seed=args.seed,
+    ).start()
+    tmdb_stub = TMDBStub(
+        latency=args.tmdb_latency,
+        error_rate=args.tmdb_error_rate,
+        seed=args.seed + 1,
+    ).start()
+
+    # Must be set before util.trakt is imported
+    os.environ["TRAKT_API_BASE"] = trakt_stub.base_url
+    os.environ["TMDB_API_BASE"] = tmdb_stub.api_base
+    os.environ["TMDB_IMAGE_BASE"] = tmdb_stub.image_base
+    os.environ["TMDB_API_KEY"] = "stub"
+    os.environ["TRAKT_CLIENT_ID"] = "stub"
+    os.environ["TESTING"] = "true"
+    return trakt_stub, tmdb_stub
+
+
+def build_app(num_users):
+    """Import the app against the stubs and give it a populated fake Firestore"""
+    from api import view
+    from api.app import app
+
+    db = FakeFirestore()
+    users = db.collection("users")
+    expires = int(time()) + 30 * 24 * 3600
+    for i in range(num_users):
+        users.document(f"load-user-{i}").set(
+            {
+                "access_token": f"token-{i}",
+                "refresh_token": f"refresh-{i}",
+                "expired_ts": expires,
+            }
+        )
+    view.db = db
+    return app, db
+
+
+def serve(app):
+    from werkzeug.serving import make_server
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def make_request_url(base_url, route, rng, num_users, recents_ratio):
+    uid = f"load-user-{rng.randrange(num_users)}"
+    show_recents = "true" if rng.random() < recents_ratio else "false"
+    if route == "widget":
+        return f"{base_url}/api/widget?uid={uid}&show_recents={show_recents}"
+    theme = rng.choice(THEMES)
+    return (
+        f"{base_url}/api/view?uid={uid}&theme={theme}"
+        f"&show_offline=true&show_recents={show_recents}"
+    )
+
+
+def drive(base_url, args):
+    """Issue requests from args.concurrency threads until the deadline"""
+    import requests
+
+    routes = list(args.mix)
+    weights = [args.mix[r] for r in routes]
+    deadline = perf_counter() + args.duration
+    samples = []
+    samples_lock = threading.Lock()
+
+    def worker(index):
+        rng = random.Random(args.seed * 1000 + index)
+        session = requests.Session()
+        local = []
+        while perf_counter() < deadline:
+            route = rng.choices(routes, weights)[0]
+            url = make_request_url(
+                base_url, route, rng, args.users, args.recents_ratio
+            )
+            started = perf_counter()
+            try:
+                resp = session.get(url, timeout=60)
+                status, size = resp.status_code, len(resp.content)
+            except requests.RequestException:
+                status, size = "error", 0
+            local.append((route, status, perf_counter() - started, size))
+        with samples_lock:
+            samples.extend(local)
+
+    started = perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(worker, range(args.concurrency)))
+    return samples, perf_counter() - started
+
+
+def report(samples, elapsed, stubs, db, args):
+    total = len(samples)
+    by_route = defaultdict(list)
+    sizes = defaultdict(list)
+    statuses = Counter()
+    for route, status, latency, size in samples:
+        by_route[route].append(latency)
+        sizes[route].append(size)
+        statuses[str(status)] += 1
+
+    upstream = {}
+    for stub in stubs:
+        for endpoint, count in stub.calls.items():
+            upstream[f"{stub.name}:{endpoint}"] = {
+                "calls": count,
+                "per_request": count / total if total else None,
+                "errors": sum(
+                    n
+                    for (ep, status), n in stub.statuses.items()
+                    if ep == endpoint and status >= 500
+                ),
+            }
+    upstream["firestore:reads"] = {
+        "calls": db.reads,
+        "per_request": db.reads / total if total else None,
+        "errors": 0,
+    }
+
+    return {
+        "config": {
+            key: value for key, value in vars(args).items() if key != "output"
+        },
+        "requests": total,
+        "elapsed_s": elapsed,
+        "throughput_rps": total / elapsed if elapsed else None,
+        "statuses": dict(statuses),
+        "latency": {"all": latency_summary([s[2] for s in samples])}
+        | {route: latency_summary(values) for route, values in by_route.items()},
+        "mean_response_bytes": {
+            route: statistics.mean(values) for route, values in sizes.items()
+        },
+        "upstream": upstream,
+        "upstream_calls_per_request": (
+            sum(u["calls"] for u in upstream.values()) / total if total else None
+        ),
+    }
+
+
+def print_report(results):
+    print(
+        f"{results['requests']} requests in {results['elapsed_s']:.1f}s "
+        f"({results['throughput_rps']:.1f} req/s), statuses {results['statuses']}"
+    )
+    print(f"{'route':<8} {'count':>7} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for route, stats in results["latency"].items():
+        if not stats["count"]:
+            continue
+        print(
+            f"{route:<8} {stats['count']:>7} {stats['p50_ms']:>9.1f} "
+            f"{stats['p90_ms']:>9.1f} {stats['p99_ms']:>9.1f} {stats['max_ms']:>9.1f}"
+        )
+    print(f"{'upstream':<32} {'calls':>8} {'per req':>8} {'errors':>7}")
+    for name, stats in sorted(results["upstream"].items()):
+        print(
+            f"{name:<32} {stats['calls']:>8} {stats['per_request']:>8.3f} "
+            f"{stats['errors']:>7}"
+        )
+    print(f"upstream calls per request: {results['upstream_calls_per_request']:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20, help="seconds of load")
+    parser.add_argument(
+        "--warmup", type=float, default=0, help="seconds of load before measuring"
+    )
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default=parse_mix("view=3,widget=1"),
+        help="relative weights of routes, e.g. view=3,widget=1",
+    )
+    parser.add_argument(
+        "--recents-ratio", type=float, default=0.3, help="share of requests with recents"
+    )
+    parser.add_argument("--trakt-latency", type=float, default=0.08)
+    parser.add_argument("--tmdb-latency", type=float, default=0.05)
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="503 rate for both stubs"
+    )
+    parser.add_argument("--trakt-error-rate", type=float)
+    parser.add_argument("--tmdb-error-rate", type=float)
+    parser.add_argument(
+        "--rotate", type=float, default=30, help="seconds between playback changes"
+    )
+    parser.add_argument(
+        "--idle-ratio", type=float, default=0.3, help="share of users watching nothing"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--log-level", default="WARNING", help="app log level")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    if args.trakt_error_rate is None:
+        args.trakt_error_rate = args.error_rate
+    if args.tmdb_error_rate is None:
+        args.tmdb_error_rate = args.error_rate
+
+    stubs = start_stubs(args)
+    app, db = build_app(args.users)
+    # The app logs every upstream call at INFO, which would dominate the run
+    logging.getLogger().setLevel(args.log_level)
+    logging.getLogger("werkzeug").setLevel(args.log_level)
+    server = serve(app)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    try:
+        if args.warmup > 0:
+            drive(base_url, argparse.Namespace(**{**vars(args), "duration": args.warmup}))
+            for stub in stubs:
+                stub.reset_counts()
+            db.reads = 0
+
+        samples, elapsed = drive(base_url, args)
+        results = report(samples, elapsed, stubs, db, args)
+    finally:
+        server.shutdown()
+        for stub in stubs:
+            stub.stop()
+
+    print_report(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Local HTTP stand-ins for the Trakt and TMDB APIs used by the load test.
+
+Each stub runs a threaded http.server on 127.0.0.1, sleeps a configurable
+latency (with jitter) before answering, fails a configurable fraction of
+requests with 503 and counts calls per endpoint.
+"""
+import json
+import random
+import re
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import sleep, time
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.fixtures import make_posters
+
+MOVIES = [
+    {"title": "Inception", "year": 2010, "ids": {"trakt": 1, "tmdb": 27205}},
+    {"title": "Arrival", "year": 2016, "ids": {"trakt": 2, "tmdb": 329865}},
+    {"title": "Heat", "year": 1995, "ids": {"trakt": 3, "tmdb": 949}},
+    {"title": "Alien", "year": 1979, "ids": {"trakt": 4, "tmdb": 348}},
+]
+SHOWS = [
+    {"title": "Severance", "year": 2022, "ids": {"trakt": 11, "tmdb": 95396}},
+    {"title": "Dark", "year": 2017, "ids": {"trakt": 12, "tmdb": 70523}},
+]
+
+
+class StubServer:
+    """
+    Threaded HTTP server answering requests from
+    `route(method, path, query, headers, body)`, which returns
+    (endpoint, status, content_type, body_bytes). Latency is drawn
+    uniformly from latency * (1 ± jitter) seconds.
+    """
+
+    name = "stub"
+
+    def __init__(self, latency=0.05, jitter=0.5, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.calls = Counter()
+        self.statuses = Counter()
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _handle(self, method):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                status, content_type, payload = stub.dispatch(
+                    method, self.path, self.headers, body
+                )
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name=f"{self.name}-stub", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset_counts(self):
+        with self._lock:
+            self.calls.clear()
+            self.statuses.clear()
+
+    def dispatch(self, method, raw_path, headers, body):
+        parsed = urlparse(raw_path)
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+
+        with self._lock:
+            delay = self.latency * (1 + self._rng.uniform(-self.jitter, self.jitter))
+            failed = self._rng.random() < self.error_rate
+        if delay > 0:
+            sleep(delay)
+
+        endpoint, status, content_type, payload = self.route(
+            method, parsed.path, query, headers, body
+        )
+        if failed:
+            status, content_type, payload = 503, "text/plain", b"stub error"
+
+        with self._lock:
+            self.calls[endpoint] += 1
+            self.statuses[(endpoint, status)] += 1
+        return status, content_type, payload
+
+    def route(self, method, path, query, headers, body):
+        raise NotImplementedError
+
+
+def _json(endpoint, data, status=200):
+    return endpoint, status, "application/json", json.dumps(data).encode("utf-8")
+
+
+class TraktStub(StubServer):
+    """
+    Trakt API: /users/me/watching, /users/me/history, /users/me and
+    /oauth/token. What a user is watching changes every `rotate` seconds,
+    and `idle_ratio` of the time they are watching nothing (204).
+    """
+
+    name = "trakt"
+
+    def __init__(self, rotate=30, idle_ratio=0.3, **kwargs):
+        super().__init__(**kwargs)
+        self.rotate = rotate
+        self.idle_ratio = idle_ratio
+
+    def _token_slot(self, token):
+        bucket = int(time() // self.rotate) if self.rotate > 0 else 0
+        return random.Random(f"{token}:{bucket}")
+
+    def _watching(self, token):
+        rng = self._token_slot(token)
+        if rng.random() < self.idle_ratio:
+            return None
+        if rng.random() < 0.5:
+            return {"type": "movie", "movie": rng.choice(MOVIES)}
+        return {
+            "type": "episode",
+            "show": rng.choice(SHOWS),
+            "episode": {
+                "season": rng.randint(1, 3),
+                "number": rng.randint(1, 10),
+                "title": "Stub Episode",
+            },
+        }
+
+    def _history(self, limit):
+        items = []
+        for i in range(limit):
+            if i % 2:
+                items.append({"type": "movie", "movie": MOVIES[i % len(MOVIES)]})
+            else:
+                items.append(
+                    {
+                        "type": "episode",
+                        "show": SHOWS[i % len(SHOWS)],
+                        "episode": {"season": 1, "number": i + 1, "title": f"Episode {i + 1}"},
+                    }
+                )
+            items[-1]["watched_at"] = f"2024-01-{i + 1:02d}T20:00:00.000Z"
+        return items
+
+    def route(self, method, path, query, headers, body):
+        if method == "POST" and path == "/oauth/token":
+            return _json(
+                "oauth/token",
+                {
+                    "access_token": f"stub-{random.getrandbits(48):012x}",
+                    "refresh_token": f"stub-{random.getrandbits(48):012x}",
+                    "expires_in": 7776000,
+                },
+            )
+        if path == "/users/me/watching":
+            data = self._watching(headers.get("Authorization", ""))
+            if data is None:
+                return "users/me/watching", 204, "application/json", b""
+            return _json("users/me/watching", data)
+        if path == "/users/me/history":
+            return _json("users/me/history", self._history(int(query.get("limit", 5))))
+        if path == "/users/me":
+            return _json("users/me", {"username": "stub", "ids": {"slug": "stub"}})
+        return _json("not_found", {"error": "not found"}, status=404)
+
+
+class TMDBStub(StubServer):
+    """
+    TMDB API (/3/movie/<id>, /3/tv/<id>) and image CDN
+    (/t/p/<size>/<file>), serving fixture posters.
+    """
+
+    name = "tmdb"
+
+    _DETAILS = re.compile(r"^/3/(movie|tv)/(\d+)$")
+    _IMAGE = re.compile(r"^/t/p/[^/]+/(\d+)\.jpg$")
+
+    def __init__(self, posters=8, **kwargs):
+        super().__init__(**kwargs)
+        self.posters = make_posters(posters)
+
+    @property
+    def api_base(self):
+        return f"{self.base_url}/3"
+
+    @property
+    def image_base(self):
+        return f"{self.base_url}/t/p/w300"
+
+    def route(self, method, path, query, headers, body):
+        match = self._DETAILS.match(path)
+        if match:
+            media_type, tmdb_id = match.group(1), int(match.group(2))
+            return _json(
+                f"3/{media_type}",
+                {
+                    "id": tmdb_id,
+                    "poster_path": f"/{tmdb_id % len(self.posters)}.jpg",
+                    "genres": [{"name": "Drama"}, {"name": "Science Fiction"}],
+                    "runtime": 90 + tmdb_id % 60 if media_type == "movie" else None,
+                },
+            )
+        match = self._IMAGE.match(path)
+        if match:
+            poster = self.posters[int(match.group(1)) % len(self.posters)]
+            return "image", 200, "image/jpeg", poster
+        return _json("not_found", {"status_message": "not found"}, status=404)
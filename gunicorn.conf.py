@@ -0,0 +1,25 @@
+# Gunicorn settings for the view service (docker-compose.yml)
+#
+# When PROMETHEUS_MULTIPROC_DIR is set, each worker writes its metrics to
+# that directory and /metrics aggregates them. The directory is emptied on
+# startup so samples from a previous run are not counted, and the files of
+# exited workers are marked dead.
+import glob
+import os
+
+
+def on_starting(server):
+    path = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if not path:
+        return
+    os.makedirs(path, exist_ok=True)
+    for stale in glob.glob(os.path.join(path, "*.db")):
+        os.remove(stale)
+
+
+def child_exit(server, worker):
+    if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        return
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,44 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+HEAVY_MODULES = [
+    "PIL",
+    "colorgram",
+    "numpy",
+    "firebase_admin",
+    "profanityfilter",
+    "requests",
+]
+
+
+def test_entry_points_import_without_heavy_dependencies():
+    """Test that importing the app loads no heavy dependency or Firestore client."""
+    env = dict(os.environ)
+    env.pop("TESTING", None)
+    env.pop("FIREBASE", None)
+    code = (
+        "import json, sys; import api.app; "
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+
+    proc = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True
+    )
+
+    assert proc.returncode == 0, proc.stderr
+    assert json.loads(proc.stdout.strip().splitlines()[-1]) == []
+
+
+def test_profanity_filter_built_on_first_use():
+    """Test that the ProfanityFilter is created once, when first needed."""
+    from util import profanity
+
+    profanity.profanity_check("Hello World")
+    first = profanity.get_filter()
+
+    assert first is not None
+    assert profanity.get_filter() is first
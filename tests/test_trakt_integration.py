@@ -13,8 +13,11 @@ os.environ["TESTING"] = "true"
 @pytest.fixture
 def client():
     """Create a test client for the view Flask application."""
-    from api.view import app
+    from api.view import app, media_states, recent_histories, svg_cache
     app.config.update({"TESTING": True})
+    svg_cache.clear()
+    media_states.clear()
+    recent_histories.clear()
 
     with app.test_client() as client:
         yield client
@@ -27,7 +30,7 @@ def client():
 
 def test_generate_token():
     """Test that generate_token calls Trakt API correctly."""
-    with patch("util.trakt.requests.post") as mock_post:
+    with patch("util.trakt.http_client.post") as mock_post:
         mock_post.return_value.json.return_value = {
             "access_token": "abc",
             "refresh_token": "def",
@@ -46,7 +49,7 @@ def test_generate_token():
 
 def test_refresh_token():
     """Test that refresh_token calls Trakt API correctly."""
-    with patch("util.trakt.requests.post") as mock_post:
+    with patch("util.trakt.http_client.post") as mock_post:
         mock_post.return_value.json.return_value = {
             "access_token": "new_abc",
             "refresh_token": "new_def",
@@ -63,7 +66,7 @@ def test_refresh_token():
 
 def test_get_user_profile():
     """Test that get_user_profile fetches user from Trakt."""
-    with patch("util.trakt.requests.get") as mock_get:
+    with patch("util.trakt.http_client.get") as mock_get:
         mock_get.return_value.json.return_value = {"username": "trakt_user"}
 
         from util import trakt
@@ -76,7 +79,7 @@ def test_get_user_profile():
 
 def test_get_current_playback_playing():
     """Test that get_current_playback returns data when user is watching."""
-    with patch("util.trakt.requests.get") as mock_get:
+    with patch("util.trakt.http_client.get") as mock_get:
         mock_get.return_value.status_code = 200
         mock_get.return_value.json.return_value = {
             "type": "movie",
@@ -92,7 +95,7 @@ def test_get_current_playback_playing():
 
 def test_get_current_playback_nothing():
     """Test that get_current_playback returns {} on 204."""
-    with patch("util.trakt.requests.get") as mock_get:
+    with patch("util.trakt.http_client.get") as mock_get:
         mock_get.return_value.status_code = 204
 
         from util import trakt
@@ -102,6 +105,73 @@ def test_get_current_playback_nothing():
         assert result == {}
 
 
+def test_get_current_playback_outage_raises():
+    """Test that a Trakt outage is reported instead of reading as idle."""
+    with patch("util.trakt.http_client.get") as mock_get:
+        mock_get.return_value.status_code = 503
+
+        from util import trakt
+
+        with pytest.raises(trakt.UpstreamError):
+            trakt.get_current_playback("access_tok")
+
+
+def test_get_tmdb_metadata_invalid_json():
+    """Test that a malformed TMDB body is treated as unavailable, not cached."""
+    with patch("util.trakt.http_client.get") as mock_get, patch(
+        "util.trakt.TMDB_API_KEY", "key"
+    ):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.side_effect = ValueError("bad json")
+
+        from util import trakt
+
+        assert trakt.get_tmdb_metadata(424242, "movie") == {}
+        with pytest.raises(trakt.UpstreamError):
+            trakt.get_tmdb_metadata(424242, "movie", strict=True)
+        assert mock_get.call_count == 2
+
+
+def test_get_tmdb_metadata_single_call_cached():
+    """Test that TMDB metadata is fetched once and served from cache."""
+    with patch("util.trakt.http_client.get") as mock_get, patch(
+        "util.trakt.TMDB_API_KEY", "key"
+    ):
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = {
+            "poster_path": "/poster.jpg",
+            "genres": [{"name": "Drama"}, {"name": "Crime"}],
+            "runtime": 125,
+        }
+
+        from util import trakt
+
+        trakt._tmdb_cache.clear()
+        meta = trakt.get_tmdb_metadata(1396, "tv")
+        poster = trakt.get_tmdb_poster(1396, "tv")
+
+        assert meta["poster_url"] == f"{trakt.TMDB_IMAGE_BASE}/poster.jpg"
+        assert meta["genres"] == ["Drama", "Crime"]
+        assert meta["runtime"] == 125
+        assert poster == meta["poster_url"]
+        mock_get.assert_called_once()
+
+
+def test_get_tmdb_metadata_error_not_cached():
+    """Test that transient TMDB errors are not cached."""
+    with patch("util.trakt.http_client.get") as mock_get, patch(
+        "util.trakt.TMDB_API_KEY", "key"
+    ):
+        mock_get.return_value.status_code = 503
+
+        from util import trakt
+
+        trakt._tmdb_cache.clear()
+        assert trakt.get_tmdb_metadata(42, "movie") == {}
+        assert trakt.get_tmdb_metadata(42, "movie") == {}
+        assert mock_get.call_count == 2
+
+
 # -------------------------------------------------------------------
 # api/view.py Trakt integration tests (source=stremio)
 # -------------------------------------------------------------------
@@ -143,6 +213,492 @@ def test_view_stremio_offline(mock_make_svg, mock_get_trakt, client):
     assert "Offline" in args[0] or "Offline" in args[1]
 
 
+@patch("api.view.get_recent_history")
+@patch("api.view.get_trakt_media_info")
+@patch("api.view.make_svg")
+def test_view_recents_fetched_concurrently(
+    mock_make_svg, mock_get_trakt, mock_history, client
+):
+    """Test that recents are fetched in the background and passed to make_svg."""
+    import threading
+
+    history_threads = []
+
+    def fake_history(uid, limit, poster_size=None, embed_posters=True, user=None):
+        history_threads.append(threading.current_thread())
+        return [{"title": "S01E01", "info": "Show"}], False
+
+    mock_history.side_effect = fake_history
+    mock_get_trakt.return_value = (None, False, None, None)
+    mock_make_svg.return_value = "<svg>recents</svg>"
+
+    response = client.get("/?uid=trakt_user&show_offline=true&show_recents=true")
+
+    assert response.status_code == 200
+    assert history_threads[0] is not threading.current_thread()
+    args, _ = mock_make_svg.call_args
+    assert args[-1] == [{"title": "S01E01", "info": "Show"}]
+
+
+@patch("api.view.RECENTS_POSTER_DEADLINE", 0.2)
+@patch("api.view.load_recent_poster")
+@patch("api.view.trakt.get_watch_history")
+@patch("api.view.db")
+def test_get_watch_history_poster_deadline(mock_db, mock_history, mock_poster):
+    """Test that slow posters fall back to placeholders instead of blocking."""
+    import threading
+    from api.view import get_watch_history
+    from util import tokens
+
+    tokens.invalidate("trakt_user")
+    release = threading.Event()
+
+    def fake_poster(tmdb_id, media_type, size=None, embed=True):
+        if tmdb_id == 2:
+            release.wait(2)
+        return f"https://img/{tmdb_id}.jpg", "/9j/4AAQ"
+
+    mock_db.collection.return_value.document.return_value.get.return_value.to_dict.return_value = {
+        "access_token": "at",
+        "expired_ts": 4102444800,
+    }
+    mock_history.return_value = [
+        {"type": "movie", "movie": {"title": "Fast", "year": 2020, "ids": {"tmdb": 1}}},
+        {"type": "movie", "movie": {"title": "Slow", "year": 2021, "ids": {"tmdb": 2}}},
+    ]
+    mock_poster.side_effect = fake_poster
+
+    try:
+        recents = get_watch_history("trakt_user", limit=2)
+    finally:
+        release.set()
+
+    assert [r["title"] for r in recents] == ["Fast", "Slow"]
+    assert recents[0]["poster_url"] == "https://img/1.jpg"
+    assert recents[0]["poster_b64"] == "/9j/4AAQ"
+    assert recents[0]["poster_mime"] == "image/jpeg"
+    assert recents[1]["poster_b64"] is None
+
+
+@patch("api.view.get_trakt_media_info")
+@patch("api.view.make_svg")
+def test_view_svg_cache_hit_skips_render(mock_make_svg, mock_get_trakt, client):
+    """Test that the same state and params are only rendered once."""
+    mock_get_trakt.return_value = (None, False, None, None)
+    mock_make_svg.return_value = "<svg>offline</svg>"
+
+    first = client.get("/?uid=trakt_user&show_offline=true&theme=compact")
+    second = client.get("/?theme=compact&show_offline=true&uid=trakt_user")
+    other_theme = client.get("/?uid=trakt_user&show_offline=true&theme=apple")
+
+    assert first.data == second.data == b"<svg>offline</svg>"
+    assert other_theme.status_code == 200
+    assert mock_make_svg.call_count == 2
+
+
+@patch("api.view.get_trakt_media_info")
+@patch("api.view.make_svg")
+def test_view_etag_not_modified(mock_make_svg, mock_get_trakt, client):
+    """Test that a matching If-None-Match gets an empty 304."""
+    mock_get_trakt.return_value = (None, False, None, None)
+    mock_make_svg.return_value = "<svg>offline</svg>"
+
+    first = client.get("/?uid=trakt_user&show_offline=true")
+    etag = first.headers["ETag"]
+    second = client.get(
+        "/?uid=trakt_user&show_offline=true", headers={"If-None-Match": etag}
+    )
+
+    assert first.status_code == 200
+    assert "max-age=" in first.headers["Cache-Control"]
+    assert second.status_code == 304
+    assert second.data == b""
+
+
+@patch("api.view.get_trakt_media_info")
+@patch("api.view.make_svg")
+def test_view_now_playing_must_revalidate(mock_make_svg, mock_get_trakt, client):
+    """Test that now-playing cards are never served from a shared cache."""
+    mock_item = {
+        "currently_playing_type": "movie",
+        "name": "Inception",
+        "artists": [{"name": "2010"}],
+        "album": {"images": []},
+    }
+    mock_get_trakt.return_value = (mock_item, True, None, None)
+    mock_make_svg.return_value = "<svg>now playing</svg>"
+
+    response = client.get("/?uid=trakt_user")
+
+    assert "no-cache" in response.headers["Cache-Control"]
+    assert response.headers["ETag"]
+
+
+@patch("api.view.IMAGE_NEGATIVE_TTL", 0)
+@patch("api.view.download_image")
+def test_load_image_failure_not_cached_forever(mock_download):
+    """Test that a failed image download is retried once the negative TTL passes."""
+    from api.view import image_cache, load_image
+
+    image_cache.delete("https://img/broken.jpg")
+    mock_download.side_effect = [None, b"poster"]
+
+    assert load_image("https://img/broken.jpg") is None
+    assert load_image("https://img/broken.jpg") == b"poster"
+    assert load_image("https://img/broken.jpg") == b"poster"
+    assert mock_download.call_count == 2
+
+
+@patch("api.view.tokens.get_access_token")
+def test_get_current_playback_prefers_polled_state(mock_token, tmp_path):
+    """Test that polled state is served without touching Firestore or Trakt."""
+    from api.view import get_current_playback
+    from util.state_store import StateStore
+
+    store = StateStore(str(tmp_path / "state.db"))
+    store.put("polled_user", {"type": "movie", "movie": {"title": "Heat"}}, 0)
+
+    with patch("api.view.get_state_store", return_value=store):
+        data = get_current_playback("polled_user")
+
+    assert data["movie"]["title"] == "Heat"
+    mock_token.assert_not_called()
+
+
+@patch("api.view.RECENTS_POSTER_DEADLINE", 0.5)
+@patch("api.view.load_recent_poster")
+@patch("api.view.trakt.get_watch_history")
+def test_slow_recent_poster_does_not_make_history_stale(mock_history, mock_poster, client):
+    """A poster slower than the stale budget leaves the Trakt history fresh."""
+    import time
+    from api.view import get_recent_history, recent_histories
+
+    heat = {"type": "movie", "movie": {"title": "Heat", "ids": {"tmdb": 949}}}
+    alien = {"type": "movie", "movie": {"title": "Alien", "ids": {"tmdb": 348}}}
+    user = MagicMock()
+    user.access_token.return_value = "at"
+
+    def slow_poster(tmdb_id, media_type, size=None, embed=True):
+        if tmdb_id == 348:
+            time.sleep(0.3)
+        return None, None
+
+    mock_poster.side_effect = slow_poster
+
+    with patch.object(recent_histories, "budget", 0.1):
+        mock_history.return_value = [heat]
+        get_recent_history("poster_user", limit=2, user=user)
+        mock_history.return_value = [alien, heat]
+        history, stale = get_recent_history("poster_user", limit=2, user=user)
+
+    assert [h["title"] for h in history] == ["Alien", "Heat"]
+    assert stale is False
+
+
+@patch("api.view.make_svg")
+@patch("api.view.get_current_playback")
+def test_view_serves_last_good_state_during_outage(mock_playback, mock_make_svg, client):
+    """A failing Trakt serves the last good card, marked stale, without waiting."""
+    from util import trakt
+
+    mock_playback.return_value = {"type": "movie", "movie": {"title": "Heat"}}
+    mock_make_svg.side_effect = lambda *args, **kwargs: f"<svg>{args[1]}</svg>"
+
+    fresh = client.get("/?uid=outage_user&cover_image=false")
+    mock_playback.side_effect = trakt.UpstreamError("Trakt returned 503")
+    first_stale = client.get("/?uid=outage_user&cover_image=false")
+    second_stale = client.get("/?uid=outage_user&cover_image=false")
+
+    assert b"Heat" in fresh.data
+    assert "X-Stale" not in fresh.headers
+    for response in (first_stale, second_stale):
+        assert response.data == fresh.data
+        assert response.headers["X-Stale"] == "true"
+        assert "no-cache" in response.headers["Cache-Control"]
+    # The second request is answered from the last good state while failing
+    assert mock_playback.call_count == 2
+
+
+@patch("api.view.get_current_playback")
+def test_view_outage_without_last_good_is_not_cacheable(mock_playback, client):
+    """The first card during an outage is marked stale and never cached publicly."""
+    from util import trakt
+
+    mock_playback.side_effect = trakt.UpstreamError("Trakt returned 503")
+
+    response = client.get("/?uid=first_outage_user&show_offline=true")
+
+    assert b"Offline" in response.data
+    assert response.headers["X-Stale"] == "true"
+    assert "public" not in response.headers["Cache-Control"]
+
+
+@patch("api.view.trakt.get_watch_history")
+@patch("api.view.trakt.get_current_playback")
+@patch("api.view.tokens.get_access_token")
+def test_view_recents_share_one_token_lookup(
+    mock_token, mock_playback, mock_history, client
+):
+    """Playback and recents of one request share a single token lookup."""
+    mock_token.return_value = "at"
+    mock_playback.return_value = {}
+    mock_history.return_value = []
+
+    with patch("api.view.get_state_store", return_value=None):
+        response = client.get("/?uid=shared_user&show_offline=true&show_recents=true")
+
+    assert response.status_code == 200
+    mock_token.assert_called_once()
+    mock_playback.assert_called_once_with("at")
+    mock_history.assert_called_once_with("at", limit=5)
+
+
+@patch("api.view.trakt.get_current_playback")
+@patch("api.view.tokens.get_access_token")
+def test_get_current_playback_store_error_falls_back(mock_token, mock_playback):
+    """Test that a locked state store falls back to a live Trakt call."""
+    import sqlite3
+    from api.view import get_current_playback
+
+    store = MagicMock()
+    store.touch.side_effect = sqlite3.OperationalError("database is locked")
+    store.get.side_effect = sqlite3.OperationalError("database is locked")
+    mock_token.return_value = "at"
+    mock_playback.return_value = {"type": "movie", "movie": {"title": "Heat"}}
+
+    with patch("api.view.get_state_store", return_value=store):
+        data = get_current_playback("locked_user")
+
+    assert data["movie"]["title"] == "Heat"
+    store.put.assert_not_called()
+
+
+@patch("api.view.sleep")
+@patch("api.view.get_trakt_media_info")
+def test_widget_events_pushes_state_changes(mock_get_trakt, mock_sleep, client):
+    """The widget stream only sends a state event when playback changes."""
+    from api.view import state_fingerprint
+
+    playing = ({"type": "movie", "movie": {"title": "Inception"}}, True, 1000, 9000)
+    stopped = ({"type": "movie", "movie": {"title": "Inception"}}, False, 0, 9000)
+    mock_get_trakt.side_effect = [playing, playing, stopped]
+    rendered = state_fingerprint(*playing, [])
+
+    # Three polls before the stream expires, none answered from the shared check
+    with patch("api.view.WIDGET_STREAM_DURATION", 3), patch(
+        "api.view.time", side_effect=[0, 0, 1, 2, 3]
+    ), patch("api.view.widget_stream_states.get", return_value=None):
+        response = client.get(f"/widget/events?uid=trakt_user&state={rendered}")
+        body = response.get_data(as_text=True)
+        response.close()
+
+    assert response.mimetype == "text/event-stream"
+    assert response.headers["Cache-Control"] == "no-cache"
+    events = body.split("\n\n")
+    assert events[0].startswith("retry: ")
+    assert events[1] == ": keep-alive"
+    assert events[2] == ": keep-alive"
+    assert events[3] == f"event: state\ndata: {state_fingerprint(*stopped, [])}"
+
+
+@patch("api.view.sleep")
+@patch("api.view.get_media_state")
+def test_widget_events_share_checks_and_cap(mock_state, mock_sleep, client):
+    """Streams of one uid share a state check, and excess streams get a 503."""
+    from api import view
+
+    mock_state.return_value = ((None, False, None, None), False)
+    view.widget_stream_states.clear()
+
+    with patch("api.view.WIDGET_STREAM_DURATION", 1), patch(
+        "api.view.time", side_effect=[0, 0, 1, 0, 0, 1]
+    ):
+        for _ in range(2):
+            response = client.get("/widget/events?uid=shared_stream&refresh=60")
+            response.get_data()
+            response.close()
+
+    mock_state.assert_called_once()
+    mock_sleep.assert_called_with(60)
+
+    with patch("api.view._widget_streams") as mock_streams:
+        mock_streams.acquire.return_value = False
+        response = client.get("/widget/events?uid=shared_stream")
+    assert response.status_code == 503
+
+
+def test_widget_links_events_relative_to_page(client):
+    """The events URL resolves under the prefix the widget is served at."""
+    with patch("api.view.get_media_state", return_value=((None, False, None, None), False)):
+        html = client.get("/widget?uid=u").get_data(as_text=True)
+
+    assert '"widget/events?uid=u"' in html
+
+
+def test_widget_events_fallback_only_when_closed(client):
+    """The page only falls back to reloading when the stream was refused."""
+    import re
+
+    with patch("api.view.get_media_state", return_value=((None, False, None, None), False)):
+        html = client.get("/widget?uid=u").get_data(as_text=True)
+
+    handler = re.search(r"events\.onerror = \(\) => \{(.*?)\n            \};", html, re.S)
+    assert handler is not None
+    body = handler.group(1)
+    # Reconnecting streams return before the reload is scheduled
+    assert body.index("events.readyState !== EventSource.CLOSED") < body.index("reload()")
+    assert "events.close()" not in body
+
+
+@patch("api.view.get_trakt_media_info")
+def test_now_json_etag(mock_get_trakt, client):
+    """/now returns compact JSON with poster URLs and answers 304 when unchanged."""
+    mock_get_trakt.return_value = (
+        {
+            "currently_playing_type": "movie",
+            "name": "Inception",
+            "artists": [{"name": "2010 • Action"}],
+            "album": {"images": [{"url": "https://img/p.jpg"}, {"url": "https://img/p.jpg"}]},
+        },
+        True,
+        None,
+        None,
+    )
+
+    response = client.get("/now?uid=trakt_user")
+    data = response.get_json()
+
+    assert response.status_code == 200
+    assert data["title"] == "Inception"
+    assert data["info"] == "2010 • Action"
+    assert data["status"] == "Now Watching"
+    assert data["poster_url"] == "https://img/p.jpg"
+    assert data["is_now_playing"] is True
+    assert data["recents"] == []
+
+    etag = response.headers["ETag"]
+    response = client.get("/now?uid=trakt_user", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+
+
+@patch("api.view.load_image_b64")
+@patch("api.view.get_trakt_media_info")
+def test_widget_client_render_links_poster(mock_get_trakt, mock_load_b64, client):
+    """Client-rendered widgets link the poster instead of embedding it."""
+    mock_get_trakt.return_value = (
+        {
+            "currently_playing_type": "movie",
+            "name": "Inception",
+            "artists": [{"name": "Movie"}],
+            "album": {"images": [{"url": "https://img/p.jpg"}]},
+        },
+        True,
+        None,
+        None,
+    )
+
+    response = client.get("/widget?uid=trakt_user&render=client")
+    html = response.get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert 'src="https://img/p.jpg"' in html
+    assert '"now?uid=trakt_user\\u0026render=client"' in html
+    mock_load_b64.assert_not_called()
+
+
+@patch("api.view.load_image")
+@patch("api.view.get_current_playback")
+def test_batch_shares_upstream_fetches(mock_playback, mock_load_image, client):
+    """Variants of one uid share the playback fetch and the cover download."""
+    mock_playback.return_value = {
+        "type": "movie",
+        "movie": {"title": "Inception", "year": 2010, "ids": {"tmdb": 27205}},
+    }
+    mock_load_image.return_value = None
+
+    with patch("api.view.trakt.get_tmdb_metadata") as mock_meta:
+        mock_meta.return_value = {"poster_url": "https://img/p.jpg", "genres": [], "runtime": 0}
+        response = client.post(
+            "/batch",
+            json={
+                "specs": [
+                    {"uid": "trakt_user", "params": {"theme": "default"}},
+                    {"uid": "trakt_user", "params": {"theme": "compact", "cover_image": True}},
+                    {"params": {}},
+                ]
+            },
+        )
+
+    results = response.get_json()["results"]
+    assert response.status_code == 200
+    assert [r["status"] for r in results] == [200, 200, 400]
+    assert "<svg" in results[0]["svg"]
+    assert results[0]["etag"] != results[1]["etag"]
+    mock_playback.assert_called_once()
+    assert mock_playback.call_args[0][0] == "trakt_user"
+    mock_load_image.assert_called_once_with("https://img/p.jpg")
+
+
+@patch("api.view.get_recent_history")
+@patch("api.view.get_media_state")
+def test_now_validates_and_clamps_recents_limit(mock_state, mock_recents, client):
+    """/now answers 400 for a bad recents_limit and caps large ones."""
+    mock_state.return_value = ((None, False, None, None), False)
+    mock_recents.return_value = ([], False)
+
+    bad = client.get("/now?uid=u&show_recents=true&recents_limit=x")
+    client.get("/now?uid=u&show_recents=true&recents_limit=100000")
+
+    assert bad.status_code == 400
+    assert mock_recents.call_args[0][1] == 10
+
+
+def test_batch_rejects_non_object_body(client):
+    """A JSON array instead of an object is a 400, not a server error."""
+    response = client.post("/batch", json=[{"uid": "u"}])
+
+    assert response.status_code == 400
+    assert response.data == b"Missing specs"
+
+
+@patch("api.view.get_trakt_media_info")
+def test_batch_multipart(mock_get_trakt, client):
+    """format=multipart returns one SVG part per spec."""
+    mock_get_trakt.return_value = (None, False, None, None)
+
+    with patch("api.view.get_current_playback", return_value={}):
+        response = client.post(
+            "/batch?format=multipart",
+            json={"specs": [{"uid": "a"}, {"uid": "b", "params": {"theme": "apple"}}]},
+        )
+
+    assert response.mimetype == "multipart/mixed"
+    boundary = response.mimetype_params["boundary"]
+    parts = response.get_data().split(f"--{boundary}".encode())
+    assert len(parts) == 4
+    assert all(b"Content-Type: image/svg+xml" in part for part in parts[1:3])
+
+
+@patch("api.view.trakt.get_current_playback")
+@patch("api.view.tokens.get_access_token")
+def test_view_rejected_token_renders_offline(mock_token, mock_playback, client):
+    """Test that a Trakt 401 still renders the offline card."""
+    from util import trakt
+
+    mock_token.return_value = "revoked"
+    mock_playback.side_effect = trakt.TraktAuthError("Trakt rejected the access token")
+
+    with patch("api.view.get_state_store", return_value=None), patch(
+        "api.view.tokens.invalidate"
+    ) as mock_invalidate:
+        response = client.get("/?uid=revoked_user&show_offline=true")
+
+    assert response.status_code == 200
+    assert response.mimetype == "image/svg+xml"
+    assert b"Offline" in response.data
+    mock_invalidate.assert_called_once_with("revoked_user")
+
+
 @patch("api.view.get_trakt_media_info")
 def test_view_stremio_invalid_token(mock_get_trakt, client):
     """Test handling of exception from Trakt flow."""
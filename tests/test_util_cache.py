@@ -0,0 +1,123 @@
+import sys
+import os
+from unittest.mock import patch
+
+# Add the parent directory to the path to import the util module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def test_ttl_cache_expiry():
+    """Test that entries disappear once their TTL has passed."""
+    from util.cache import TTLCache
+
+    cache = TTLCache(maxsize=10, ttl=60)
+    with patch("util.cache.monotonic", return_value=1000):
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=5)
+    with patch("util.cache.monotonic", return_value=1010):
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_ttl_cache_byte_budget_evicts_lru():
+    """Test that the byte budget evicts the least recently used entries."""
+    from util.cache import TTLCache
+
+    cache = TTLCache(maxsize=100, ttl=60, max_bytes=10)
+    cache.set("a", b"aaaa")
+    cache.set("b", b"bbbb")
+    cache.get("a")
+    cache.set("c", b"cccc")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"aaaa"
+    assert cache.get("c") == b"cccc"
+    assert cache.stats()["bytes"] == 8
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_cache_skips_oversized_values():
+    """Test that a value larger than the whole budget is not cached."""
+    from util.cache import TTLCache
+
+    cache = TTLCache(maxsize=100, ttl=60, max_bytes=4)
+    cache.set("small", b"ab")
+    cache.set("big", b"too large")
+
+    assert cache.get("big") is None
+    assert cache.get("small") == b"ab"
+
+
+def test_ttl_cache_replace_updates_bytes():
+    """Test that overwriting a key doesn't double count its size."""
+    from util.cache import TTLCache
+
+    cache = TTLCache(maxsize=100, ttl=60, max_bytes=100)
+    cache.set("a", b"12345")
+    cache.set("a", b"12")
+
+    assert cache.stats()["bytes"] == 2
+    assert len(cache) == 1
+
+
+def test_last_good_cache_serves_stale_while_failing():
+    """Test that failed refreshes serve the last good value and retry later."""
+    from concurrent.futures import ThreadPoolExecutor
+    from util.cache import LastGoodCache
+
+    results = [("v1", True), ("partial", False), ("v2", True)]
+    calls = []
+
+    def load():
+        calls.append(1)
+        return results[len(calls) - 1]
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        cache = LastGoodCache(executor, budget=1, retry_after=60)
+        with patch("util.cache.monotonic", return_value=1000):
+            assert cache.get("uid", load) == ("v1", False)
+            assert cache.get("uid", load) == ("v1", True)
+            # Failing: answered without another refresh until retry_after
+            assert cache.get("uid", load) == ("v1", True)
+            assert len(calls) == 2
+        with patch("util.cache.monotonic", return_value=1061):
+            assert cache.get("uid", load) == ("v1", True)
+            executor.submit(lambda: None).result()
+            assert len(calls) == 3
+            assert cache.get("uid", lambda: ("v3", True)) == ("v3", False)
+
+
+def test_last_good_cache_slow_refresh():
+    """Test that a refresh slower than the budget serves the last good value."""
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from util.cache import LastGoodCache
+
+    release = threading.Event()
+
+    def slow_load():
+        release.wait(5)
+        return "v2", True
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        cache = LastGoodCache(executor, budget=0.05, retry_after=60)
+        cache.get("uid", lambda: ("v1", True))
+
+        assert cache.get("uid", slow_load) == ("v1", True)
+        release.set()
+        executor.submit(lambda: None).result()
+        assert cache.get("uid", lambda: ("v3", True)) == ("v3", False)
+
+
+def test_last_good_cache_incomplete_first_load_is_stale():
+    """Test that an incomplete value is flagged even with nothing to fall back on."""
+    from concurrent.futures import ThreadPoolExecutor
+    from util.cache import LastGoodCache
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        cache = LastGoodCache(executor)
+        assert cache.get("uid", lambda: ("partial", False)) == ("partial", True)
+        assert cache.get("uid", lambda: ("v1", True)) == ("v1", False)
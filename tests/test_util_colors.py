@@ -0,0 +1,71 @@
+import io
+import sys
+import os
+from unittest.mock import patch
+
+from PIL import Image
+
+# Add the parent directory to the path to import the util module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def make_two_tone(top=(200, 30, 30), bottom=(10, 10, 10), size=(300, 450)):
+    """Encode an image whose top two thirds and bottom third differ in color."""
+    img = Image.new("RGB", size, bottom)
+    img.paste(Image.new("RGB", (size[0], size[1] * 2 // 3), top), (0, 0))
+    out = io.BytesIO()
+    img.save(out, format="PNG")
+    return out.getvalue()
+
+
+def test_extract_palette_dominant_first():
+    """Test that the most common color comes first."""
+    from util.colors import extract_palette
+
+    palette = extract_palette(make_two_tone(), 5)
+
+    assert palette[0] == (200, 30, 30)
+    assert (10, 10, 10) in palette
+
+
+def test_get_palette_memoized():
+    """Test that repeat renders of the same poster skip extraction."""
+    os.environ["TESTING"] = "true"
+    from api import view
+
+    content = make_two_tone(top=(20, 120, 220))
+    view.palette_cache.clear()
+
+    with patch("api.view.extract_palette", wraps=view.extract_palette) as mock_extract:
+        first = view.get_palette(content)
+        second = view.get_palette(content)
+
+    assert first == second
+    assert all(abs(a - b) <= 4 for a, b in zip(first[0], (20, 120, 220)))
+    mock_extract.assert_called_once()
+
+
+def test_numpy_extractor_matches_colorgram():
+    """Test that the NumPy extractor reproduces colorgram's palette."""
+    from util.colors import extract_palette
+
+    noise = Image.effect_noise((120, 180), 80).convert("RGB")
+    tinted = Image.blend(noise, Image.new("RGB", noise.size, (180, 40, 120)), 0.5)
+    out = io.BytesIO()
+    tinted.save(out, format="JPEG")
+    content = out.getvalue()
+
+    assert extract_palette(content, 5, extractor="numpy") == extract_palette(
+        content, 5, extractor="colorgram"
+    )
+
+
+def test_pick_bar_color_skip_dark():
+    """Test that dark swatches are skipped only when requested."""
+    from util.colors import pick_bar_color
+
+    palette = [(10, 10, 10), (200, 30, 30)]
+
+    assert pick_bar_color(palette, is_skip_dark=True) == "c81e1e"
+    assert pick_bar_color(palette, is_skip_dark=False) == "0a0a0a"
+    assert pick_bar_color([(5, 5, 5)], is_skip_dark=True) is None
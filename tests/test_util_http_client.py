@@ -0,0 +1,36 @@
+import sys
+import os
+from unittest.mock import patch
+
+# Add the parent directory to the path to import the util module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def test_get_session_is_shared():
+    """Test that all callers reuse the same pooled session."""
+    from util import http_client
+
+    assert http_client.get_session() is http_client.get_session()
+
+
+def test_session_adapter_pools_and_retries():
+    """Test that the mounted adapter has pooling and retry configured."""
+    from util import http_client
+
+    adapter = http_client.get_session().get_adapter("https://api.trakt.tv")
+
+    assert adapter._pool_maxsize == http_client.HTTP_POOL_MAXSIZE
+    assert adapter.max_retries.total == http_client.HTTP_RETRIES
+    assert 503 in adapter.max_retries.status_forcelist
+    assert "POST" not in adapter.max_retries.allowed_methods
+    assert adapter.max_retries.read == 0
+
+
+def test_get_applies_default_timeout():
+    """Test that requests without an explicit timeout get the default one."""
+    from util import http_client
+
+    with patch.object(http_client.get_session(), "get") as mock_get:
+        http_client.get("https://api.themoviedb.org/3/movie/1")
+
+    assert mock_get.call_args.kwargs["timeout"] == http_client.HTTP_TIMEOUT
@@ -0,0 +1,61 @@
+import io
+import sys
+import os
+
+from PIL import Image
+
+# Add the parent directory to the path to import the util module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def make_poster(width=300, height=450, fmt="JPEG", exif=None):
+    """Encode a noisy poster-shaped test image."""
+    img = Image.effect_noise((width, height), 64).convert("RGB")
+    out = io.BytesIO()
+    kwargs = {"exif": exif} if exif is not None else {}
+    img.save(out, format=fmt, quality=95, **kwargs)
+    return out.getvalue()
+
+
+def test_process_image_downscales_to_cover_box():
+    """Test that posters are shrunk so they still cover the display box."""
+    from util import images
+
+    processed = images.process_image(make_poster(), (20, 30), fmt="JPEG")
+    img = Image.open(io.BytesIO(processed))
+
+    assert img.size == (20 * images.IMAGE_SCALE, 30 * images.IMAGE_SCALE)
+    assert images.image_mime(processed) == "image/jpeg"
+
+
+def test_process_image_square_box_keeps_aspect():
+    """Test that a square box keeps the poster's aspect ratio."""
+    from util import images
+
+    processed = images.process_image(make_poster(), (60, 60), fmt="JPEG")
+    img = Image.open(io.BytesIO(processed))
+
+    assert img.width == 60 * images.IMAGE_SCALE
+    assert img.height == 90 * images.IMAGE_SCALE
+
+
+def test_process_image_strips_metadata_and_webp():
+    """Test that metadata is dropped and WebP output is supported."""
+    from util import images
+
+    exif = Image.Exif()
+    exif[0x010E] = "secret description"
+    source = make_poster(exif=exif.tobytes())
+
+    processed = images.process_image(source, (28, 42), fmt="WEBP")
+
+    assert images.image_mime(processed) == "image/webp"
+    assert b"secret description" not in processed
+    assert len(processed) < len(source)
+
+
+def test_process_image_invalid_bytes():
+    """Test that undecodable input returns None."""
+    from util import images
+
+    assert images.process_image(b"not an image", (20, 30)) is None
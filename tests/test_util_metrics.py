@@ -0,0 +1,78 @@
+import sys
+import os
+from unittest.mock import MagicMock, patch
+
+# Add the parent directory to the path to import the util module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+os.environ["TESTING"] = "true"
+
+from prometheus_client import REGISTRY
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_stage_observes_duration():
+    """Test that a timed block is recorded under its stage label."""
+    from util import metrics
+
+    before = sample("stremio_stage_seconds_count", stage="test_stage")
+    with metrics.stage("test_stage"):
+        pass
+
+    assert sample("stremio_stage_seconds_count", stage="test_stage") == before + 1
+
+
+def test_http_client_counts_upstream_by_host_and_status():
+    """Test that upstream calls are counted per host and status code."""
+    from util import http_client
+
+    labels = {"host": "upstream.example", "status": "503"}
+    before = sample("stremio_upstream_requests_total", **labels)
+
+    with patch.object(http_client.get_session(), "get") as mock_get:
+        mock_get.return_value = MagicMock(status_code=503)
+        http_client.get("https://upstream.example/path")
+
+    assert sample("stremio_upstream_requests_total", **labels) == before + 1
+
+
+def test_named_cache_records_hits_and_misses():
+    """Test that named caches report lookups for the hit ratio."""
+    from util.cache import TTLCache
+
+    cache = TTLCache(name="test_cache")
+    cache.get("a")
+    cache.set("a", 1)
+    cache.get("a")
+
+    assert sample("stremio_cache_requests_total", cache="test_cache", result="miss") == 1
+    assert sample("stremio_cache_requests_total", cache="test_cache", result="hit") == 1
+
+
+def test_unknown_themes_share_a_label():
+    """Test that arbitrary theme strings don't create new label values."""
+    from util import metrics
+
+    assert metrics.theme_label("compact") == "compact"
+    assert metrics.theme_label("<script>") == "other"
+
+
+@patch("api.view.get_trakt_media_info")
+def test_metrics_endpoint_exposes_response_sizes(mock_get_trakt):
+    """Test that /metrics reports response sizes labelled by theme."""
+    from api.view import app, svg_cache
+
+    svg_cache.clear()
+    mock_get_trakt.return_value = (None, False, None, None)
+
+    with app.test_client() as client:
+        client.get("/?uid=metrics_user&theme=compact")
+        response = client.get("/metrics")
+
+    body = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert 'stremio_response_bytes_count{route="catch_all",theme="compact"}' in body
+    assert 'stremio_request_seconds_count{route="catch_all"}' in body
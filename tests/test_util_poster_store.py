@@ -0,0 +1,50 @@
+import sys
+import os
+
+# Add the parent directory to the path to import the util module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def test_poster_store_shared_between_instances(tmp_path):
+    """Test that a poster written by one worker is read by another."""
+    from util.poster_store import PosterStore
+
+    writer = PosterStore(str(tmp_path), max_bytes=1024)
+    reader = PosterStore(str(tmp_path), max_bytes=1024)
+
+    writer.put("https://img/a.jpg", b"poster-a")
+
+    assert reader.get("https://img/a.jpg") == b"poster-a"
+    assert reader.get("https://img/missing.jpg") is None
+
+
+def test_poster_store_content_addressed(tmp_path):
+    """Test that identical images under different URLs are stored once."""
+    from util.poster_store import PosterStore
+
+    store = PosterStore(str(tmp_path), max_bytes=1024)
+    store.put("https://img/w300/a.jpg", b"same-bytes")
+    store.put("https://img/alias/a.jpg", b"same-bytes")
+
+    assert len(os.listdir(tmp_path / "blobs")) == 1
+    assert store.get("https://img/alias/a.jpg") == b"same-bytes"
+
+
+def test_poster_store_evicts_least_recently_read(tmp_path):
+    """Test that eviction drops the least recently read posters first."""
+    import hashlib
+    import time
+    from util.poster_store import PosterStore
+
+    store = PosterStore(str(tmp_path), max_bytes=20, evict_every=1000)
+    store.put("https://img/old.jpg", b"o" * 10)
+    old_blob = tmp_path / "blobs" / hashlib.sha256(b"o" * 10).hexdigest()
+    os.utime(old_blob, (time.time() - 100, time.time() - 100))
+
+    store.put("https://img/new.jpg", b"n" * 10)
+    store.put("https://img/third.jpg", b"t" * 10)
+    store.evict()
+
+    assert store.get("https://img/old.jpg") is None
+    assert store.get("https://img/new.jpg") == b"n" * 10
+    assert store.get("https://img/third.jpg") == b"t" * 10
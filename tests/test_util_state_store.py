@@ -0,0 +1,68 @@
+import sys
+import os
+
+# Add the parent directory to the path to import the util module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def test_state_store_roundtrip_and_max_age(tmp_path):
+    """Test that stored state is served until it is older than max_age."""
+    from util.state_store import StateStore
+
+    store = StateStore(str(tmp_path / "state.db"))
+    store.touch("user", now=1000)
+    assert store.get("user", max_age=60, now=1000) is None
+
+    store.put("user", {"type": "movie"}, next_poll_at=1015, now=1000)
+
+    assert store.get("user", max_age=60, now=1030) == {"type": "movie"}
+    assert store.get("user", max_age=60, now=1100) is None
+
+
+def test_state_store_idle_state_is_a_hit(tmp_path):
+    """Test that 'nothing playing' is stored as {} rather than a miss."""
+    from util.state_store import StateStore
+
+    store = StateStore(str(tmp_path / "state.db"))
+    store.put("idle", {}, next_poll_at=1060, now=1000)
+
+    assert store.get("idle", max_age=60, now=1010) == {}
+
+
+def test_state_store_due_users(tmp_path):
+    """Test that only recently seen users with a due poll are returned."""
+    from util.state_store import StateStore
+
+    store = StateStore(str(tmp_path / "state.db"))
+    store.touch("new", now=1000)
+    store.touch("waiting", now=1000)
+    store.put("waiting", {}, next_poll_at=1100, now=1000)
+    store.touch("inactive", now=0)
+
+    assert store.due_users(active_within=600, now=1010) == ["new"]
+    assert set(store.due_users(active_within=600, now=1200)) == {"new", "waiting"}
+
+
+def test_next_poll_delay_adaptive():
+    """Test that playing users are polled faster than idle ones."""
+    from util import state_store
+
+    assert state_store.next_poll_delay({"type": "movie"}) < state_store.next_poll_delay({})
+
+
+def test_poller_backs_off_failing_user(tmp_path):
+    """Test that an unexpected error reschedules the user instead of leaving it due."""
+    from unittest.mock import patch
+    from api import now_playing_poller
+    from util.state_store import StateStore
+
+    store = StateStore(str(tmp_path / "state.db"))
+    store.touch("revoked")
+
+    with patch(
+        "api.now_playing_poller.tokens.get_access_token",
+        side_effect=RuntimeError("refresh token revoked"),
+    ):
+        assert now_playing_poller.poll_user(None, store, "revoked") is False
+
+    assert store.due_users(active_within=60) == []
@@ -0,0 +1,178 @@
+import sys
+import os
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+# Add the parent directory to the path to import the util module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+FAR_FUTURE = 4102444800
+
+
+def make_db(token_info):
+    """Build a mock Firestore client whose users/{uid} document holds token_info."""
+    db = MagicMock()
+    doc = db.collection.return_value.document.return_value.get.return_value
+    doc.exists = True
+    doc.to_dict.return_value = dict(token_info)
+    return db
+
+
+def test_get_access_token_cached():
+    """Test that a valid token is only read from Firestore once."""
+    from util import tokens
+
+    tokens.invalidate("cached_user")
+    db = make_db({"access_token": "at", "expired_ts": FAR_FUTURE})
+
+    assert tokens.get_access_token(db, "cached_user") == "at"
+    assert tokens.get_access_token(db, "cached_user") == "at"
+    assert db.collection.return_value.document.return_value.get.call_count == 1
+
+
+def test_get_access_token_invalidate_rereads():
+    """Test that invalidation forces the next call back to Firestore."""
+    from util import tokens
+
+    tokens.invalidate("stale_user")
+    db = make_db({"access_token": "at", "expired_ts": FAR_FUTURE})
+
+    tokens.get_access_token(db, "stale_user")
+    tokens.invalidate("stale_user")
+    tokens.get_access_token(db, "stale_user")
+
+    assert db.collection.return_value.document.return_value.get.call_count == 2
+
+
+def test_get_access_token_refreshes_expired():
+    """Test that an expired token is refreshed and persisted."""
+    from util import tokens
+
+    tokens.invalidate("expired_user")
+    db = make_db({"access_token": "old", "refresh_token": "rt", "expired_ts": 1})
+    doc_ref = db.collection.return_value.document.return_value
+
+    with patch("util.tokens.trakt.refresh_token") as mock_refresh:
+        mock_refresh.return_value = {
+            "access_token": "new",
+            "refresh_token": "rt2",
+            "expires_in": 7200,
+        }
+        assert tokens.get_access_token(db, "expired_user") == "new"
+
+    mock_refresh.assert_called_once_with("rt")
+    update = doc_ref.update.call_args[0][0]
+    assert update["refresh_token"] == "rt2"
+
+
+def test_get_current_playback_unauthorized():
+    """Test that a 401 from Trakt surfaces as TraktAuthError."""
+    with patch("util.trakt.http_client.get") as mock_get:
+        mock_get.return_value.status_code = 401
+
+        from util import trakt
+
+        with pytest.raises(trakt.TraktAuthError):
+            trakt.get_current_playback("revoked")
+
+
+def test_concurrent_refresh_single_flight(tmp_path):
+    """Test that concurrent requests for an expired token refresh only once."""
+    import threading
+    import time
+    from util import tokens
+
+    tokens.invalidate("storm_user")
+    state = {"access_token": "old", "refresh_token": "rt", "expired_ts": 1}
+
+    db = MagicMock()
+    doc_ref = db.collection.return_value.document.return_value
+
+    def get_doc():
+        doc = MagicMock()
+        doc.exists = True
+        doc.to_dict.return_value = dict(state)
+        return doc
+
+    doc_ref.get.side_effect = get_doc
+    doc_ref.update.side_effect = state.update
+
+    def slow_refresh(refresh_token):
+        time.sleep(0.1)
+        return {"access_token": "new", "refresh_token": "rt2", "expires_in": 7200}
+
+    results = []
+    with patch("util.tokens.TOKEN_LOCK_DIR", str(tmp_path)), patch(
+        "util.tokens.trakt.refresh_token", side_effect=slow_refresh
+    ) as mock_refresh:
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(tokens.get_access_token(db, "storm_user"))
+            )
+            for _ in range(5)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    assert results == ["new"] * 5
+    mock_refresh.assert_called_once_with("rt")
+
+
+def test_user_context_loads_once():
+    """Test that a request's fetches share one token lookup, even across invalidation."""
+    from util import tokens
+
+    tokens.invalidate("context_user")
+    db = make_db({"access_token": "at", "expired_ts": FAR_FUTURE})
+    user = tokens.UserContext(db, "context_user")
+
+    with patch("util.tokens.get_access_token", wraps=tokens.get_access_token) as mock_get:
+        assert user.access_token() == "at"
+        assert user.access_token() == "at"
+        user.invalidate()
+        assert user.access_token() is None
+
+    mock_get.assert_called_once_with(db, "context_user")
+
+
+def test_refresh_expiring_tokens(tmp_path):
+    """Test that tokens inside the window are refreshed ahead of expiry."""
+    import time
+    from util import tokens
+
+    soon = int(time.time()) + 60
+    doc = MagicMock()
+    doc.id = "expiring_user"
+    doc.reference.get.return_value.exists = True
+    doc.reference.get.return_value.to_dict.return_value = {
+        "access_token": "old",
+        "refresh_token": "rt",
+        "expired_ts": soon,
+    }
+
+    db = MagicMock()
+    query = (
+        db.collection.return_value.where.return_value.order_by.return_value.limit.return_value
+    )
+    query.stream.return_value = [doc]
+
+    tokens.invalidate("expiring_user")
+    with patch("util.tokens.TOKEN_LOCK_DIR", str(tmp_path)), patch(
+        "util.tokens.trakt.refresh_token"
+    ) as mock_refresh:
+        mock_refresh.return_value = {
+            "access_token": "new",
+            "refresh_token": "rt2",
+            "expires_in": 7200,
+        }
+        count = tokens.refresh_expiring_tokens(db, window=3600, batch_size=10, rate=0)
+
+    assert count == 1
+    mock_refresh.assert_called_once_with("rt")
+    field, op, cutoff = db.collection.return_value.where.call_args[0]
+    assert (field, op) == ("expired_ts", "<")
+    assert cutoff >= soon + 3600 - 60
+    doc.reference.update.assert_called_once()
@@ -0,0 +1,88 @@
+import json
+import sys
+import os
+from unittest.mock import patch
+
+# Add the parent directory to the path to import the util module
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from flask import Flask
+
+from util import tracing
+
+
+def make_app():
+    app = Flask(__name__)
+    tracing.init_app(app)
+
+    @app.route("/work")
+    def work():
+        with tracing.span("outer"):
+            with tracing.span("inner", key="value"):
+                pass
+        return "ok"
+
+    return app
+
+
+def test_spans_outside_a_request_are_ignored():
+    """Test that spans are no-ops when no trace is active."""
+    with tracing.span("orphan"):
+        pass
+
+    assert tracing.current_trace() is None
+    assert tracing.request_id() == "-"
+
+
+def test_executor_tasks_join_the_submitters_trace():
+    """Test that spans in pool threads attach to the request's trace."""
+    trace = tracing.Trace("rid", "test")
+    token = tracing._current_trace.set(trace)
+    try:
+        with tracing.ContextThreadPoolExecutor(max_workers=1) as pool:
+            with tracing.span("parent"):
+                assert pool.submit(_traced_child).result() == "rid"
+    finally:
+        tracing._current_trace.reset(token)
+
+    spans = {span["name"]: span for span in trace.spans}
+    assert spans["traced_child"]["parent"] == spans["parent"]["id"]
+    assert spans["traced_child"]["thread"] != spans["parent"]["thread"]
+
+
+@tracing.traced("traced_child")
+def _traced_child():
+    return tracing.request_id()
+
+
+def test_request_id_is_echoed_and_server_timing_added():
+    """Test that requests keep a valid incoming id and report span timings."""
+    app = make_app()
+
+    with patch("util.tracing.TRACE_SERVER_TIMING", True):
+        with app.test_client() as client:
+            response = client.get("/work", headers={"X-Request-ID": "abc-123"})
+            bad = client.get("/work", headers={"X-Request-ID": "bad id\x7f"})
+
+    assert response.headers["X-Request-ID"] == "abc-123"
+    timing = response.headers["Server-Timing"]
+    assert "outer;dur=" in timing and "inner;dur=" in timing and "total;dur=" in timing
+    assert bad.headers["X-Request-ID"] != "bad id\x7f"
+
+
+def test_file_exporter_writes_one_line_per_request(tmp_path):
+    """Test that finished traces are appended to the trace file."""
+    app = make_app()
+    path = tmp_path / "traces.jsonl"
+
+    with patch("util.tracing._exporter", tracing.FileExporter(str(path))):
+        with app.test_client() as client:
+            client.get("/work", headers={"X-Request-ID": "first"})
+            client.get("/work", headers={"X-Request-ID": "second"})
+
+    traces = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [t["request_id"] for t in traces] == ["first", "second"]
+    assert traces[0]["status"] == 200
+    spans = {span["name"]: span for span in traces[0]["spans"]}
+    assert spans["inner"]["parent"] == spans["outer"]["id"]
+    assert spans["inner"]["attrs"] == {"key": "value"}
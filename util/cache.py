@@ -0,0 +1,209 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import TimeoutError
+from time import monotonic
+
+from util import metrics
+
+
+_MISSING = object()
+
+
+def _sizeof_bytes(value):
+    return len(value) if value else 0
+
+
+class TTLCache:
+    """
+    Thread-safe in-process cache with per-entry expiry and LRU eviction.
+    Bounded by number of entries (maxsize) and, if max_bytes is given, by the
+    total size of the cached values as measured by sizeof.
+    Caches given a name report their hits and misses to util.metrics.
+    """
+
+    def __init__(self, maxsize=1024, ttl=3600, max_bytes=None, sizeof=None, name=None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or _sizeof_bytes
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.currsize_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _pop(self, key):
+        value, _, size = self._data.pop(key)
+        self.currsize_bytes -= size
+        return value
+
+    def get(self, key, default=None):
+        value = self._get(key, default)
+        if self.name is not None:
+            metrics.record_cache(self.name, value is not default)
+        return value
+
+    def _get(self, key, default):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at, _ = entry
+            if expires_at <= monotonic():
+                self._pop(key)
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.ttl
+
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+
+            # A single value larger than the whole budget is never cached
+            if self.max_bytes is not None and size > self.max_bytes:
+                return
+
+            self._data[key] = (value, monotonic() + ttl, size)
+            self.currsize_bytes += size
+            while len(self._data) > self.maxsize or (
+                self.max_bytes is not None and self.currsize_bytes > self.max_bytes
+            ):
+                oldest = next(iter(self._data))
+                self._pop(oldest)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.currsize_bytes = 0
+
+    def stats(self):
+        return {
+            "entries": len(self._data),
+            "bytes": self.currsize_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def __len__(self):
+        return len(self._data)
+
+
+class LastGoodCache:
+    """
+    Stale-while-revalidate front for slow or unreliable upstreams.
+
+    get(key, load) runs load() on executor and waits up to `budget` seconds
+    for it. load returns (value, complete); complete is False when an
+    upstream failed and the value was built without its data. Complete
+    values are remembered for max_age seconds as the key's last good value.
+
+    When the refresh is too slow or incomplete, the last good value is
+    served instead and the key is marked as failing. While a key is failing
+    its last good value is served straight away, and a new refresh is
+    started in the background at most every retry_after seconds, until one
+    succeeds. A load that raises discards the last good value.
+
+    get returns (value, stale); stale is True whenever the value isn't a
+    complete fresh one, including an incomplete load with no last good
+    value to fall back on.
+    """
+
+    def __init__(self, executor, budget=1.0, retry_after=10, max_age=3600,
+                 maxsize=1024, name=None):
+        self.executor = executor
+        self.budget = budget
+        self.retry_after = retry_after
+        self.name = name
+        self._values = TTLCache(maxsize=maxsize, ttl=max_age, name=name)
+        # key -> monotonic time of the last refresh attempt while failing
+        self._failing = TTLCache(maxsize=maxsize, ttl=max_age)
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, load):
+        """Return (value, stale) for key"""
+        with self._lock:
+            last = self._values.get(key, _MISSING)
+            future = self._inflight.get(key)
+            last_attempt = self._failing.get(key)
+            if last is not _MISSING and last_attempt is not None:
+                if future is None and monotonic() - last_attempt >= self.retry_after:
+                    self._failing.set(key, monotonic())
+                    self._start(key, load)
+                return self._stale(last, "failing")
+            if future is None:
+                future = self._start(key, load)
+
+        if last is _MISSING:
+            # Nothing to fall back on; an incomplete value is still flagged
+            # so callers don't let it be cached downstream
+            value, complete = future.result()
+            if complete:
+                return value, False
+            return self._stale(value, "incomplete")
+
+        try:
+            value, complete = future.result(timeout=self.budget)
+        except TimeoutError:
+            # Leave the refresh running; it clears the mark when it lands
+            with self._lock:
+                if key in self._inflight:
+                    self._failing.set(key, monotonic())
+            return self._stale(last, "slow")
+        if complete:
+            return value, False
+        return self._stale(last, "incomplete")
+
+    def _stale(self, value, reason):
+        if self.name is not None:
+            metrics.record_stale(self.name, reason)
+        return value, True
+
+    def _start(self, key, load):
+        future = self.executor.submit(self._refresh, key, load)
+        self._inflight[key] = future
+        return future
+
+    def _refresh(self, key, load):
+        try:
+            value, complete = load()
+        except Exception:
+            with self._lock:
+                self._inflight.pop(key, None)
+                self._values.delete(key)
+                self._failing.delete(key)
+            raise
+
+        with self._lock:
+            self._inflight.pop(key, None)
+            if complete:
+                self._values.set(key, value)
+                self._failing.delete(key)
+            else:
+                self._failing.set(key, monotonic())
+        return value, complete
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self._failing.clear()
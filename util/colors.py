@@ -0,0 +1,103 @@
+import io
+import math
+import os
+
+from util.images import pil_image
+
+# Palettes are extracted from a thumbnail; dominant colors survive downscaling
+PALETTE_THUMBNAIL_SIZE = int(os.getenv("PALETTE_THUMBNAIL_SIZE", "64"))
+# "colorgram" or "numpy"
+PALETTE_EXTRACTOR = os.getenv("PALETTE_EXTRACTOR", "colorgram")
+
+# Two bits each of luminance, hue and lightness
+_NUM_BINS = 4 ** 3
+
+
+def isLightOrDark(rgbColor=[0, 128, 255], threshold=127.5):
+    # https://stackoverflow.com/a/58270890
+    [r, g, b] = rgbColor
+    hsp = math.sqrt(0.299 * (r * r) + 0.587 * (g * g) + 0.114 * (b * b))
+    if hsp > threshold:
+        return "light"
+    else:
+        return "dark"
+
+
+def pick_bar_color(colors, is_skip_dark):
+    """
+    Return the first palette color as a hex string, skipping dark colors if
+    is_skip_dark is set. Returns None if no color qualifies.
+    """
+    for r, g, b in colors:
+
+        light_or_dark = isLightOrDark([r, g, b], threshold=80)
+
+        if light_or_dark == "dark" and is_skip_dark:
+            # Skip to use bar in dark color
+            continue
+
+        return "%02x%02x%02x" % (r, g, b)
+    return None
+
+
+def extract_palette_colorgram(img, count):
+    import colorgram
+
+    colors = colorgram.extract(img, count)
+    return [(c.rgb.r, c.rgb.g, c.rgb.b) for c in colors]
+
+
+def extract_palette_numpy(img, count):
+    """
+    Vectorized equivalent of colorgram's quantized histogram: pixels are
+    binned by the top two bits of luminance, hue and lightness, and each
+    swatch is the mean color of one of the most populated bins.
+    """
+    import numpy as np
+
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    pixels = np.asarray(img, dtype=np.int32).reshape(-1, 3)
+    r, g, b = pixels[:, 0], pixels[:, 1], pixels[:, 2]
+
+    most = pixels.max(axis=1)
+    least = pixels.min(axis=1)
+    diff = np.maximum(most - least, 1)
+    lightness = (most + least) >> 1
+
+    # Same integer hue formula as colorgram, including its channel tie order
+    hue = np.where(
+        most == r,
+        (g - b) * 255 // diff + np.where(g < b, 1530, 0),
+        np.where(most == g, (b - r) * 255 // diff + 510, (r - g) * 255 // diff + 1020),
+    )
+    hue = np.where(most == least, 0, hue // 6)
+    luminance = (r * 0.2126 + g * 0.7152 + b * 0.0722).astype(np.int32)
+
+    bins = ((luminance >> 6) << 4) | ((hue >> 6) << 2) | (lightness >> 6)
+
+    counts = np.bincount(bins, minlength=_NUM_BINS)
+    sums = np.stack(
+        [np.bincount(bins, weights=pixels[:, c], minlength=_NUM_BINS) for c in range(3)],
+        axis=1,
+    ).astype(np.int64)
+
+    palette = []
+    for i in np.argsort(-counts, kind="stable")[:count]:
+        if counts[i] == 0:
+            break
+        palette.append(tuple(int(v) for v in sums[i] // counts[i]))
+    return palette
+
+
+def extract_palette(content, count=5, extractor=None):
+    """
+    Return up to `count` dominant colors of encoded image bytes as (r, g, b)
+    tuples, most common first.
+    """
+    img = pil_image().open(io.BytesIO(content))
+    img.thumbnail((PALETTE_THUMBNAIL_SIZE, PALETTE_THUMBNAIL_SIZE))
+
+    if (extractor or PALETTE_EXTRACTOR) == "numpy":
+        return extract_palette_numpy(img, count)
+    return extract_palette_colorgram(img, count)
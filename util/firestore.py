@@ -1,18 +1,21 @@
 import json
 import os
+import threading
 from base64 import b64decode
 
-import firebase_admin
-from firebase_admin import credentials
-from firebase_admin import firestore
-
 
 def get_firestore_db():
     # In testing environment, return a mock client
     if os.getenv("TESTING") == "true":
         from unittest.mock import MagicMock
         return MagicMock()
-    
+
+    # firebase_admin pulls in the whole Google Cloud client stack, so it is
+    # only imported once a client is actually needed
+    import firebase_admin
+    from firebase_admin import credentials
+    from firebase_admin import firestore
+
     if not firebase_admin._apps:
         firebase_config = os.getenv("FIREBASE")
         if firebase_config is None:
@@ -23,3 +26,25 @@ def get_firestore_db():
         firebase_admin.initialize_app(cred)
 
     return firestore.client()
+
+
+class LazyFirestore:
+    """
+    Stands in for the Firestore client and creates it on first use, so
+    importing a service doesn't pay for firebase_admin until a request
+    actually reads or writes a document.
+    """
+
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = get_firestore_db()
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self._get_client(), name)
@@ -0,0 +1,82 @@
+import os
+import threading
+from time import perf_counter
+
+from util import metrics
+
+# Pool sizing is per process, i.e. per gunicorn worker
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.2"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def _build_session():
+    # requests and its TLS stack are imported with the first upstream call
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    # Only idempotent methods are retried on 5xx, connection errors are
+    # retried for any method since the request never reached the server.
+    # Read timeouts are not retried: a stalled host would otherwise hold the
+    # caller for HTTP_RETRIES + 1 full timeouts
+    retry = Retry(
+        total=HTTP_RETRIES,
+        connect=HTTP_RETRIES,
+        read=0,
+        status=HTTP_RETRIES,
+        backoff_factor=HTTP_BACKOFF,
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_CONNECTIONS,
+        pool_maxsize=HTTP_POOL_MAXSIZE,
+        max_retries=retry,
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session():
+    """
+    Return the process-wide keep-alive session.
+    Connections are pooled per host and reused across requests.
+    """
+    global _session
+
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
+
+
+def _send(send, url, **kwargs):
+    """Call a session method with the default timeout, counting it by host and status"""
+    kwargs.setdefault("timeout", HTTP_TIMEOUT)
+    started = perf_counter()
+    status = "error"
+    try:
+        response = send(url, **kwargs)
+        status = response.status_code
+        return response
+    finally:
+        metrics.record_upstream(url, status, perf_counter() - started)
+
+
+def get(url, **kwargs):
+    return _send(get_session().get, url, **kwargs)
+
+
+def post(url, **kwargs):
+    return _send(get_session().post, url, **kwargs)
@@ -0,0 +1,83 @@
+import io
+import os
+
+# Output encoding for embedded images: JPEG or WEBP
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "JPEG").upper()
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+# Render at this multiple of the CSS size so posters stay sharp on HiDPI screens
+IMAGE_SCALE = float(os.getenv("IMAGE_SCALE", "2"))
+
+_MIME_TYPES = {
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+    "PNG": "image/png",
+    "GIF": "image/gif",
+}
+
+
+def pil_image():
+    """
+    Import PIL on first use and return its Image module. Only cache misses
+    decode images, so most requests never need it.
+    """
+    from PIL import Image, ImageFile
+
+    ImageFile.LOAD_TRUNCATED_IMAGES = True
+    return Image
+
+
+def image_mime(content, default="image/jpeg"):
+    """Guess the MIME type of encoded image bytes from their magic number"""
+    if not content:
+        return default
+    if content[:3] == b"\xff\xd8\xff":
+        return "image/jpeg"
+    if content[:8] == b"\x89PNG\r\n\x1a\n":
+        return "image/png"
+    if content[:4] == b"RIFF" and content[8:12] == b"WEBP":
+        return "image/webp"
+    if content[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    return default
+
+
+def process_image(content, size, fmt=None, quality=None):
+    """
+    Downscale encoded image bytes so they cover `size` (CSS width, height) at
+    IMAGE_SCALE, drop all metadata and re-encode as `fmt`.
+    Images are never upscaled. Returns the new bytes, or None on failure.
+    """
+    fmt = (fmt or IMAGE_FORMAT).upper()
+    quality = quality or IMAGE_QUALITY
+    Image = pil_image()
+
+    try:
+        img = Image.open(io.BytesIO(content))
+        img.load()
+    except Exception as e:
+        print(f"Error decoding image: {e}")
+        return None
+
+    # Same as CSS object-fit: cover, the smaller side fills the box
+    box_w, box_h = size[0] * IMAGE_SCALE, size[1] * IMAGE_SCALE
+    ratio = max(box_w / img.width, box_h / img.height)
+    if ratio < 1:
+        new_size = (max(1, round(img.width * ratio)), max(1, round(img.height * ratio)))
+        img = img.resize(new_size, Image.LANCZOS)
+
+    if fmt == "JPEG" or img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGB")
+
+    # A fresh save without exif/icc_profile strips the source metadata
+    out = io.BytesIO()
+    try:
+        img.save(out, format=fmt, quality=quality, optimize=True)
+    except Exception as e:
+        print(f"Error encoding image as {fmt}: {e}")
+        return None
+
+    processed = out.getvalue()
+    if len(processed) >= len(content):
+        # Already small enough; keep the original
+        return content
+    return processed
@@ -0,0 +1,143 @@
+import os
+from contextlib import contextmanager
+from time import perf_counter
+from urllib.parse import urlsplit
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from util import tracing
+
+# With PROMETHEUS_MULTIPROC_DIR set (see gunicorn.conf.py), every worker
+# writes its samples to that directory and /metrics sums them, so any
+# worker can answer a scrape for the whole service.
+
+STAGE_SECONDS = Histogram(
+    "stremio_stage_seconds",
+    "Time spent in each stage of building a card",
+    ["stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+UPSTREAM_REQUESTS = Counter(
+    "stremio_upstream_requests_total",
+    "HTTP requests to upstream services",
+    ["host", "status"],
+)
+UPSTREAM_SECONDS = Histogram(
+    "stremio_upstream_request_seconds",
+    "Latency of HTTP requests to upstream services",
+    ["host"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+CACHE_REQUESTS = Counter(
+    "stremio_cache_requests_total",
+    "In-process cache lookups; hit ratio is hit / (hit + miss)",
+    ["cache", "result"],
+)
+STALE_RESPONSES = Counter(
+    "stremio_stale_responses_total",
+    "Last known good values served instead of a fresh upstream fetch",
+    ["cache", "reason"],
+)
+REQUEST_SECONDS = Histogram(
+    "stremio_request_seconds",
+    "Time to build a response, per route",
+    ["route"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+RESPONSE_BYTES = Histogram(
+    "stremio_response_bytes",
+    "Response body size, per route and theme",
+    ["route", "theme"],
+    buckets=(1024, 4096, 16384, 32768, 65536, 131072, 262144, 524288, 1048576),
+)
+
+# Themes outside this set are reported as "other" to bound label cardinality
+KNOWN_THEMES = {
+    "default",
+    "compact",
+    "karaoke",
+    "apple",
+    "natemoo-re",
+    "novatorem",
+    "stremio-embed",
+}
+
+
+@contextmanager
+def stage(name):
+    """Time the enclosed block as stage `name`, and trace it as a span"""
+    started = perf_counter()
+    try:
+        with tracing.span(name):
+            yield
+    finally:
+        STAGE_SECONDS.labels(name).observe(perf_counter() - started)
+
+
+def record_upstream(url, status, seconds):
+    host = urlsplit(url).hostname or "unknown"
+    UPSTREAM_REQUESTS.labels(host, str(status)).inc()
+    UPSTREAM_SECONDS.labels(host).observe(seconds)
+
+
+def record_cache(name, hit):
+    CACHE_REQUESTS.labels(name, "hit" if hit else "miss").inc()
+
+
+def record_stale(name, reason):
+    STALE_RESPONSES.labels(name, reason).inc()
+
+
+def theme_label(theme):
+    return theme if theme in KNOWN_THEMES else "other"
+
+
+def render_metrics():
+    """Return (body, content_type) for a scrape of this process or all workers"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def init_app(app, theme_routes=()):
+    """
+    Record latency and response size of every request served by a Flask app.
+    Responses of endpoints in theme_routes are labelled with their theme
+    query parameter; the rest with the endpoint name.
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        g.metrics_started = perf_counter()
+
+    @app.after_request
+    def _observe_response(response):
+        started = g.pop("metrics_started", None)
+        route = request.endpoint or "unknown"
+        if route == "metrics":
+            return response
+
+        if started is not None:
+            REQUEST_SECONDS.labels(route).observe(perf_counter() - started)
+
+        # Streamed responses have no length up front
+        length = response.calculate_content_length()
+        if length is not None:
+            if route in theme_routes:
+                theme = theme_label(request.args.get("theme", "default"))
+            else:
+                theme = route
+            RESPONSE_BYTES.labels(route, theme).observe(length)
+        return response
@@ -0,0 +1,133 @@
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+
+_store = None
+_store_lock = threading.Lock()
+
+
+class PosterStore:
+    """
+    On-disk poster cache shared by every worker process on the host.
+
+    Image bytes are stored once under the sha256 of their content in blobs/,
+    and urls/ maps the sha256 of each URL to its blob. All writes go through
+    a temporary file and os.replace, so readers never see partial files.
+    When the blobs grow past max_bytes the least recently read are removed.
+    """
+
+    def __init__(self, root, max_bytes, evict_every=32):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.evict_every = evict_every
+        self._blob_dir = os.path.join(root, "blobs")
+        self._url_dir = os.path.join(root, "urls")
+        self._puts = 0
+        self._lock = threading.Lock()
+        os.makedirs(self._blob_dir, exist_ok=True)
+        os.makedirs(self._url_dir, exist_ok=True)
+
+    def _url_path(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self._url_dir, key)
+
+    def _blob_path(self, digest):
+        return os.path.join(self._blob_dir, digest)
+
+    def _write_atomic(self, path, data):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def get(self, url):
+        """Return the stored bytes for url, or None if absent"""
+        try:
+            with open(self._url_path(url), "r") as f:
+                digest = f.read().strip()
+            blob_path = self._blob_path(digest)
+            with open(blob_path, "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                    content = m[:]
+            # Mark as recently used for eviction
+            os.utime(blob_path)
+            return content
+        except (OSError, ValueError):
+            # Missing, evicted or empty file
+            return None
+
+    def put(self, url, content):
+        if not content or len(content) > self.max_bytes:
+            return
+
+        digest = hashlib.sha256(content).hexdigest()
+        blob_path = self._blob_path(digest)
+        try:
+            if not os.path.exists(blob_path):
+                self._write_atomic(blob_path, content)
+            self._write_atomic(self._url_path(url), digest.encode("ascii"))
+        except OSError as e:
+            print(f"Error writing poster to store: {e}")
+            return
+
+        with self._lock:
+            self._puts += 1
+            should_evict = self._puts % self.evict_every == 0
+        if should_evict:
+            self.evict()
+
+    def evict(self):
+        """Remove least recently read blobs until the store fits max_bytes"""
+        blobs = []
+        total = 0
+        with os.scandir(self._blob_dir) as entries:
+            for entry in entries:
+                if entry.name.startswith(".tmp-"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                blobs.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        if total <= self.max_bytes:
+            return
+
+        # URL entries pointing at removed blobs simply read as misses
+        blobs.sort()
+        for _, size, path in blobs:
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+
+def get_poster_store():
+    """Return the shared store if POSTER_STORE_DIR is set, else None"""
+    global _store
+
+    root = os.getenv("POSTER_STORE_DIR")
+    if not root:
+        return None
+
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                max_bytes = int(
+                    os.getenv("POSTER_STORE_MAX_BYTES", str(512 * 1024 * 1024))
+                )
+                _store = PosterStore(root, max_bytes)
+    return _store
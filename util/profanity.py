@@ -1,9 +1,24 @@
-from profanityfilter import ProfanityFilter
+import threading
 
-pf = ProfanityFilter()
+_pf = None
+_pf_lock = threading.Lock()
+
+
+def get_filter():
+    """Build the ProfanityFilter on first use; loading its word list is slow"""
+    global _pf
+
+    if _pf is None:
+        with _pf_lock:
+            if _pf is None:
+                from profanityfilter import ProfanityFilter
+
+                _pf = ProfanityFilter()
+    return _pf
 
 
 def profanity_check(name):
+    pf = get_filter()
 
     if pf.is_clean(name):
         return name
@@ -0,0 +1,137 @@
+import json
+import os
+import sqlite3
+import threading
+from time import time
+
+# Poll every few seconds while something is playing, rarely when idle
+NOW_PLAYING_FAST_INTERVAL = int(os.getenv("NOW_PLAYING_FAST_INTERVAL", "15"))
+NOW_PLAYING_SLOW_INTERVAL = int(os.getenv("NOW_PLAYING_SLOW_INTERVAL", "60"))
+# Stored state older than this is ignored and fetched live instead
+NOW_PLAYING_MAX_AGE = int(
+    os.getenv("NOW_PLAYING_MAX_AGE", str(NOW_PLAYING_SLOW_INTERVAL + 30))
+)
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def next_poll_delay(data):
+    return NOW_PLAYING_FAST_INTERVAL if data else NOW_PLAYING_SLOW_INTERVAL
+
+
+class StateStore:
+    """
+    Now-playing state shared between the view workers and the poller.
+
+    Backed by a SQLite database in WAL mode, so any number of processes on
+    the host can read while the poller writes. Each row holds the last raw
+    Trakt `watching` response for a uid, when it was fetched, when the uid
+    last had a card rendered and when the poller should look at it next.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS now_playing (
+                    uid TEXT PRIMARY KEY,
+                    data TEXT,
+                    fetched_at REAL,
+                    last_seen REAL,
+                    next_poll_at REAL DEFAULT 0
+                )
+                """
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def touch(self, uid, now=None):
+        """Record that a card for uid was requested, so the poller tracks it"""
+        if now is None:
+            now = time()
+        self._connect().execute(
+            """
+            INSERT INTO now_playing (uid, last_seen) VALUES (?, ?)
+            ON CONFLICT(uid) DO UPDATE SET last_seen = excluded.last_seen
+            """,
+            (uid, now),
+        )
+
+    def get(self, uid, max_age, now=None):
+        """
+        Return the stored watching data for uid ({} when idle), or None if
+        there is none younger than max_age seconds.
+        """
+        if now is None:
+            now = time()
+        row = self._connect().execute(
+            "SELECT data, fetched_at FROM now_playing WHERE uid = ?", (uid,)
+        ).fetchone()
+        if row is None or row[0] is None or now - row[1] > max_age:
+            return None
+        return json.loads(row[0])
+
+    def put(self, uid, data, next_poll_at, now=None):
+        if now is None:
+            now = time()
+        self._connect().execute(
+            """
+            INSERT INTO now_playing (uid, data, fetched_at, next_poll_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(uid) DO UPDATE SET
+                data = excluded.data,
+                fetched_at = excluded.fetched_at,
+                next_poll_at = excluded.next_poll_at
+            """,
+            (uid, json.dumps(data), now, next_poll_at),
+        )
+
+    def reschedule(self, uid, next_poll_at):
+        """Move the next poll of uid without touching its stored state"""
+        self._connect().execute(
+            "UPDATE now_playing SET next_poll_at = ? WHERE uid = ?",
+            (next_poll_at, uid),
+        )
+
+    def forget(self, uid):
+        self._connect().execute("DELETE FROM now_playing WHERE uid = ?", (uid,))
+
+    def due_users(self, active_within, now=None, limit=100):
+        """Users seen in the last active_within seconds whose next poll is due"""
+        if now is None:
+            now = time()
+        rows = self._connect().execute(
+            """
+            SELECT uid FROM now_playing
+            WHERE last_seen >= ? AND next_poll_at <= ?
+            ORDER BY next_poll_at
+            LIMIT ?
+            """,
+            (now - active_within, now, limit),
+        ).fetchall()
+        return [row[0] for row in rows]
+
+
+def get_state_store():
+    """Return the shared store if NOW_PLAYING_STORE is set, else None"""
+    global _store
+
+    path = os.getenv("NOW_PLAYING_STORE")
+    if not path:
+        return None
+
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = StateStore(path)
+    return _store
@@ -0,0 +1,245 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from time import sleep, time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows dev machines
+    fcntl = None
+
+from util import metrics, trakt
+from util.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Access tokens are valid for months, but re-read Firestore now and then so a
+# re-login through the callback service is picked up by every worker
+TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", "600"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
+
+_token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL, name="token")
+
+# Trakt rotates refresh tokens, so only one refresh per uid may be in flight.
+# Lock files are shared by all gunicorn workers on the host.
+TOKEN_LOCK_DIR = os.getenv(
+    "TOKEN_LOCK_DIR", os.path.join(tempfile.gettempdir(), "stremio-token-locks")
+)
+_refresh_locks = [threading.Lock() for _ in range(64)]
+
+
+def cache_token(uid, access_token, expired_ts):
+    ttl = TOKEN_CACHE_TTL
+    if expired_ts is not None:
+        ttl = min(ttl, expired_ts - int(time()))
+    if ttl > 0:
+        _token_cache.set(uid, (access_token, expired_ts), ttl=ttl)
+
+
+def invalidate(uid):
+    """Drop the cached token for uid, e.g. after a refresh or a 401 from Trakt"""
+    _token_cache.delete(uid)
+
+
+@contextmanager
+def refresh_lease(uid):
+    """
+    Hold the refresh lease for uid: an in-process lock so threads of this
+    worker queue up, plus an exclusive file lock across worker processes.
+    """
+    key = hashlib.sha1(uid.encode("utf-8")).hexdigest()
+    local_lock = _refresh_locks[int(key, 16) % len(_refresh_locks)]
+
+    with local_lock:
+        if fcntl is None:
+            yield
+            return
+
+        os.makedirs(TOKEN_LOCK_DIR, exist_ok=True)
+        with open(os.path.join(TOKEN_LOCK_DIR, f"{key}.lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def refresh_single_flight(uid, doc_ref, min_ttl=0):
+    """
+    Refresh the token for uid unless another request already did.
+    Tokens with more than min_ttl seconds left are considered fresh.
+    Returns (access_token, expired_ts), or (None, None) if the user must re-login.
+    """
+    with refresh_lease(uid):
+        # Another thread of this worker may have finished while we waited
+        cached = _token_cache.get(uid)
+        if cached is not None and cached[1] is not None and int(time()) + min_ttl < cached[1]:
+            return cached
+
+        # ...or another worker, in which case Firestore has the new token
+        with metrics.stage("firestore"):
+            doc = doc_ref.get()
+        if not doc.exists:
+            return None, None
+
+        token_info = doc.to_dict()
+        expired_ts = token_info.get("expired_ts")
+        if expired_ts is not None and int(time()) + min_ttl < expired_ts:
+            access_token = token_info.get("access_token")
+        else:
+            access_token, expired_ts = refresh_access_token(uid, doc_ref, token_info)
+
+        if access_token:
+            cache_token(uid, access_token, expired_ts)
+        return access_token, expired_ts
+
+
+def refresh_access_token(uid, doc_ref, token_info):
+    """
+    Exchange the stored refresh token for a new access token and persist it.
+    Callers must hold refresh_lease(uid).
+    Returns (access_token, expired_ts), or (None, None) if the user must re-login.
+    """
+    refresh_token = token_info.get("refresh_token")
+    if not refresh_token:
+        logger.error("No refresh_token available")
+        return None, None
+
+    logger.info("Attempting token refresh...")
+    invalidate(uid)
+    with metrics.stage("token_refresh"):
+        new_token = trakt.refresh_token(refresh_token)
+
+    # If Trakt returns error, drop token
+    if new_token.get("error"):
+        logger.error(f"Token refresh failed: {new_token.get('error')}")
+        doc_ref.delete()
+        return None, None
+
+    expired_ts = int(time()) + int(new_token.get("expires_in", 0))
+    update_data = {
+        "access_token": new_token.get("access_token"),
+        "refresh_token": new_token.get("refresh_token", refresh_token),
+        "expired_ts": expired_ts,
+    }
+    doc_ref.update(update_data)
+    logger.info("Token refreshed successfully")
+
+    return update_data["access_token"], expired_ts
+
+
+def get_access_token(db, uid):
+    """
+    Return a valid Trakt access token for uid, refreshing it if expired.
+    Tokens are cached per worker until expired_ts, so Firestore is only read
+    on a cache miss. Returns None if the user is unknown or must re-login.
+    """
+    cached = _token_cache.get(uid)
+    if cached is not None:
+        access_token, expired_ts = cached
+        if expired_ts is not None and int(time()) < expired_ts:
+            return access_token
+        invalidate(uid)
+
+    # Load token from firebase
+    doc_ref = db.collection("users").document(uid)
+    with metrics.stage("firestore"):
+        doc = doc_ref.get()
+
+    if not doc.exists:
+        logger.warning(f"No document found for uid: {uid}")
+        return None
+
+    token_info = doc.to_dict()
+    logger.info(f"Token info keys: {list(token_info.keys()) if token_info else 'None'}")
+
+    current_ts = int(time())
+    access_token = token_info.get("access_token")
+
+    # Refresh if expired
+    expired_ts = token_info.get("expired_ts")
+    if expired_ts is None or current_ts >= expired_ts:
+        logger.info(f"Token expired or no expiry. Current: {current_ts}, Expired: {expired_ts}")
+        access_token, expired_ts = refresh_single_flight(uid, doc_ref)
+
+    if not access_token:
+        return None
+
+    cache_token(uid, access_token, expired_ts)
+    return access_token
+
+
+class UserContext:
+    """
+    Per-request view of one user's Trakt credentials. The first caller loads
+    the users/{uid} document and refreshes the token if needed; concurrent
+    and later callers in the same request reuse that result.
+    """
+
+    def __init__(self, db, uid):
+        self.db = db
+        self.uid = uid
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._access_token = None
+
+    def access_token(self):
+        """Valid access token for the user, or None if they must re-login"""
+        with self._lock:
+            if not self._loaded:
+                self._access_token = get_access_token(self.db, self.uid)
+                self._loaded = True
+            return self._access_token
+
+    def invalidate(self):
+        """Forget the token after Trakt rejected it, for this request and the cache"""
+        with self._lock:
+            self._access_token = None
+            self._loaded = True
+        invalidate(self.uid)
+
+
+def refresh_expiring_tokens(db, window, batch_size=50, rate=2.0):
+    """
+    Proactively refresh every token that expires within `window` seconds.
+    Users are scanned in batches ordered by expired_ts and refreshes are
+    spaced to at most `rate` per second.
+    Returns the number of users left with a valid token.
+    """
+    cutoff = int(time()) + window
+    query = (
+        db.collection("users")
+        .where("expired_ts", "<", cutoff)
+        .order_by("expired_ts")
+        .limit(batch_size)
+    )
+
+    valid = 0
+    last_doc = None
+    while True:
+        batch_query = query.start_after(last_doc) if last_doc is not None else query
+        docs = list(batch_query.stream())
+        if not docs:
+            break
+
+        for doc in docs:
+            uid = doc.id
+            try:
+                access_token, _ = refresh_single_flight(
+                    uid, doc.reference, min_ttl=window
+                )
+                if access_token:
+                    valid += 1
+            except Exception as e:
+                logger.error(f"Proactive refresh failed for {uid}: {e}")
+            if rate > 0:
+                sleep(1.0 / rate)
+
+        if len(docs) < batch_size:
+            break
+        last_doc = docs[-1]
+
+    return valid
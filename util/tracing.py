@@ -0,0 +1,247 @@
+import contextvars
+import functools
+import itertools
+import json
+import logging
+import os
+import re
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from time import perf_counter, time
+
+# Spans of traced requests are appended to this file as JSON lines; unset to
+# keep tracing in memory only (request ids and Server-Timing still work)
+TRACE_FILE = os.getenv("TRACE_FILE")
+# Only export requests slower than this many milliseconds
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", "0"))
+# Add a Server-Timing header with the total time spent in each span name
+TRACE_SERVER_TIMING = os.getenv("TRACE_SERVER_TIMING", "false") == "true"
+
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"
+
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+_current_trace = contextvars.ContextVar("trace", default=None)
+_current_span = contextvars.ContextVar("span", default=None)
+
+
+class Trace:
+    """Spans recorded while serving one request"""
+
+    def __init__(self, request_id, name):
+        self.request_id = request_id
+        self.name = name
+        self.started_at = time()
+        self._started = perf_counter()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.spans = []
+        self.status = None
+        self.duration = None
+
+    def offset(self):
+        return perf_counter() - self._started
+
+    def add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def finish(self, status=None):
+        self.status = status
+        self.duration = self.offset()
+
+    def timings(self):
+        """Total seconds per span name, in order of first appearance"""
+        totals = {}
+        with self._lock:
+            for span in self.spans:
+                totals[span["name"]] = totals.get(span["name"], 0) + span["duration"]
+        return totals
+
+    def to_dict(self):
+        with self._lock:
+            spans = [
+                {
+                    "id": span["id"],
+                    "parent": span["parent"],
+                    "name": span["name"],
+                    "start_ms": round(span["start"] * 1000, 3),
+                    "duration_ms": round(span["duration"] * 1000, 3),
+                    "thread": span["thread"],
+                    "attrs": span["attrs"],
+                }
+                for span in self.spans
+            ]
+        return {
+            "request_id": self.request_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "status": self.status,
+            "duration_ms": round((self.duration or self.offset()) * 1000, 3),
+            "spans": spans,
+        }
+
+
+class FileExporter:
+    """Append finished traces to a JSON lines file, one write per trace"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def export(self, trace):
+        line = json.dumps(trace.to_dict(), default=str) + "\n"
+        # O_APPEND keeps lines from different workers intact
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode("utf-8"))
+        finally:
+            os.close(fd)
+
+
+_exporter = FileExporter(TRACE_FILE) if TRACE_FILE else None
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def request_id():
+    trace = _current_trace.get()
+    return trace.request_id if trace is not None else "-"
+
+
+@contextmanager
+def span(name, **attrs):
+    """Record the enclosed block as a span of the current trace, if any"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+
+    span_id = next(trace._ids)
+    token = _current_span.set(span_id)
+    start = trace.offset()
+    try:
+        yield
+    finally:
+        _current_span.reset(token)
+        trace.add(
+            {
+                "id": span_id,
+                "parent": _current_span.get(),
+                "name": name,
+                "start": start,
+                "duration": trace.offset() - start,
+                "thread": threading.current_thread().name,
+                "attrs": attrs,
+            }
+        )
+
+
+def traced(name):
+    """Decorator recording every call of a function as a span"""
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """ThreadPoolExecutor whose tasks run in the submitter's context, so
+    spans started in worker threads attach to the request's trace"""
+
+    def submit(self, fn, /, *args, **kwargs):
+        context = contextvars.copy_context()
+        return super().submit(context.run, fn, *args, **kwargs)
+
+
+def _record_factory(factory):
+    def make_record(*args, **kwargs):
+        record = factory(*args, **kwargs)
+        record.request_id = request_id()
+        return record
+
+    return make_record
+
+
+def init_logging(level=None):
+    """
+    Give every log record a request_id attribute and include it in the
+    format of the root handlers. Safe to call more than once; level, if
+    given, is applied to the root logger.
+    """
+    factory = logging.getLogRecordFactory()
+    if not getattr(factory, "_adds_request_id", False):
+        make_record = _record_factory(factory)
+        make_record._adds_request_id = True
+        logging.setLogRecordFactory(make_record)
+
+    root = logging.getLogger()
+    if not root.handlers:
+        logging.basicConfig(format=LOG_FORMAT)
+    else:
+        for handler in root.handlers:
+            handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    if level is not None:
+        root.setLevel(level)
+
+
+def server_timing(trace):
+    parts = [
+        f"{name};dur={seconds * 1000:.1f}"
+        for name, seconds in trace.timings().items()
+    ]
+    parts.append(f"total;dur={trace.offset() * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def init_app(app):
+    """
+    Trace every request served by a Flask app. The request id is taken from
+    an incoming X-Request-ID header or generated, and echoed back.
+    """
+    from flask import g, request
+
+    init_logging()
+
+    @app.before_request
+    def _start_trace():
+        rid = request.headers.get("X-Request-ID", "")
+        if not _REQUEST_ID.match(rid):
+            rid = uuid.uuid4().hex[:16]
+        trace = Trace(rid, f"{request.method} {request.path}")
+        g.trace_token = _current_trace.set(trace)
+
+    @app.after_request
+    def _add_trace_headers(response):
+        trace = _current_trace.get()
+        if trace is None:
+            return response
+        trace.status = response.status_code
+        response.headers["X-Request-ID"] = trace.request_id
+        if TRACE_SERVER_TIMING:
+            response.headers["Server-Timing"] = server_timing(trace)
+        return response
+
+    @app.teardown_request
+    def _finish_trace(exc):
+        token = g.pop("trace_token", None)
+        trace = _current_trace.get()
+        if trace is None:
+            return
+        trace.finish(trace.status if exc is None else 500)
+        if _exporter is not None and trace.duration * 1000 >= TRACE_SLOW_MS:
+            try:
+                _exporter.export(trace)
+            except OSError as e:
+                logging.getLogger(__name__).error(f"Error exporting trace: {e}")
+        if token is not None:
+            _current_trace.reset(token)
@@ -2,9 +2,11 @@ from dotenv import load_dotenv, find_dotenv
 load_dotenv(find_dotenv())
 
 import os
-import requests
 from time import time
 
+from util import http_client, metrics
+from util.cache import TTLCache
+
 TRAKT_CLIENT_ID = os.getenv("TRAKT_CLIENT_ID")
 TRAKT_CLIENT_SECRET = os.getenv("TRAKT_CLIENT_SECRET")
 TMDB_API_KEY = os.getenv("TMDB_API_KEY", "")  # Optional for poster images
@@ -13,10 +15,29 @@ BASE_URL = os.getenv("BASE_URL")
 # Redirect path for Trakt OAuth callback
 REDIRECT_URI = f"{BASE_URL}/trakt_callback"
 
-TRAKT_TOKEN_URL = "https://api.trakt.tv/oauth/token"
-TRAKT_API_BASE = "https://api.trakt.tv"
-TMDB_API_BASE = "https://api.themoviedb.org/3"
-TMDB_IMAGE_BASE = "https://image.tmdb.org/t/p/w300"
+# Upstream endpoints, overridable to point at local stubs (benchmarks/loadtest.py)
+TRAKT_API_BASE = os.getenv("TRAKT_API_BASE", "https://api.trakt.tv").rstrip("/")
+TRAKT_TOKEN_URL = f"{TRAKT_API_BASE}/oauth/token"
+TMDB_API_BASE = os.getenv("TMDB_API_BASE", "https://api.themoviedb.org/3").rstrip("/")
+TMDB_IMAGE_BASE = os.getenv("TMDB_IMAGE_BASE", "https://image.tmdb.org/t/p/w300")
+
+# TMDB metadata for a title rarely changes, so keep it around for a day
+TMDB_CACHE_TTL = int(os.getenv("TMDB_CACHE_TTL", "86400"))
+TMDB_CACHE_SIZE = int(os.getenv("TMDB_CACHE_SIZE", "2048"))
+
+_tmdb_cache = TTLCache(maxsize=TMDB_CACHE_SIZE, ttl=TMDB_CACHE_TTL, name="tmdb")
+
+
+class TraktAuthError(Exception):
+    """Raised when Trakt rejects the access token (HTTP 401)"""
+
+
+class UpstreamError(Exception):
+    """Raised when Trakt or TMDB can't be reached or answers with a server error"""
+
+
+def _is_transient(status_code):
+    return status_code == 429 or status_code >= 500
 
 
 def generate_token(authorization_code):
@@ -28,7 +49,7 @@ def generate_token(authorization_code):
         "grant_type": "authorization_code",
     }
 
-    response = requests.post(TRAKT_TOKEN_URL, json=data)
+    response = http_client.post(TRAKT_TOKEN_URL, json=data)
     response.raise_for_status()
     return response.json()
 
@@ -42,7 +63,7 @@ def refresh_token(refresh_token):
         "grant_type": "refresh_token",
     }
 
-    response = requests.post(TRAKT_TOKEN_URL, json=data)
+    response = http_client.post(TRAKT_TOKEN_URL, json=data)
     response.raise_for_status()
     return response.json()
 
@@ -55,7 +76,7 @@ def get_user_profile(access_token):
     }
 
     url = f"{TRAKT_API_BASE}/users/me"
-    response = requests.get(url, headers=headers)
+    response = http_client.get(url, headers=headers)
     response.raise_for_status()
     return response.json()
 
@@ -64,6 +85,8 @@ def get_current_playback(access_token):
     """
     Attempt to fetch the user's currently watching item from Trakt.
     Returns a dict or empty dict when nothing is playing.
+    Raises UpstreamError when Trakt is unreachable or failing, so an outage
+    isn't mistaken for the user having stopped watching.
     """
     import logging
     logger = logging.getLogger(__name__)
@@ -77,9 +100,20 @@ def get_current_playback(access_token):
     url = f"{TRAKT_API_BASE}/users/me/watching"
     try:
         logger.info(f"Calling Trakt watching endpoint: {url}")
-        resp = requests.get(url, headers=headers, timeout=10)
+        with metrics.stage("trakt_watching"):
+            resp = http_client.get(url, headers=headers, timeout=10)
         logger.info(f"Trakt watching response: {resp.status_code}")
-        
+    except Exception as e:
+        logger.error(f"Exception in get_current_playback: {e}")
+        raise UpstreamError(f"Trakt watching request failed: {e}") from e
+
+    if resp.status_code == 401:
+        raise TraktAuthError("Trakt rejected the access token")
+    if _is_transient(resp.status_code):
+        logger.error(f"Trakt watching failed with status {resp.status_code}")
+        raise UpstreamError(f"Trakt watching returned {resp.status_code}")
+
+    try:
         if resp.status_code in (204, 404):
             logger.info("User not currently watching anything (204/404)")
             return {}
@@ -90,15 +124,16 @@ def get_current_playback(access_token):
         else:
             logger.error(f"Unexpected status code: {resp.status_code}, body: {resp.text}")
             return {}
-    except Exception as e:
+    except ValueError as e:
         logger.error(f"Exception in get_current_playback: {e}")
-        return {}
+        raise UpstreamError(f"Trakt watching returned invalid JSON: {e}") from e
 
 
 def get_watch_history(access_token, limit=5):
     """
     Fetch the user's recent watch history from Trakt.
     Returns a list of recently watched items (movies and episodes).
+    Raises UpstreamError when Trakt is unreachable or failing.
     """
     headers = {
         "Authorization": f"Bearer {access_token}",
@@ -110,52 +145,80 @@ def get_watch_history(access_token, limit=5):
     params = {"limit": limit}
     
     try:
-        resp = requests.get(url, headers=headers, params=params, timeout=10)
+        with metrics.stage("trakt_history"):
+            resp = http_client.get(url, headers=headers, params=params, timeout=10)
+    except Exception as e:
+        raise UpstreamError(f"Trakt history request failed: {e}") from e
+
+    if resp.status_code == 401:
+        raise TraktAuthError("Trakt rejected the access token")
+    if _is_transient(resp.status_code):
+        raise UpstreamError(f"Trakt history returned {resp.status_code}")
+
+    try:
         if resp.status_code == 200:
             return resp.json()
         return []
-    except Exception:
-        return []
+    except ValueError as e:
+        raise UpstreamError(f"Trakt history returned invalid JSON: {e}") from e
 
 
-def get_tmdb_poster(tmdb_id, media_type="tv"):
+def get_tmdb_metadata(tmdb_id, media_type="tv", strict=False):
     """
-    Fetch poster image URL from TMDB API.
+    Fetch poster, genres and runtime for a title from TMDB in a single call.
     media_type: 'tv' for shows, 'movie' for movies
-    Returns poster URL or None if not found.
+    Returns dict with poster_url, genres (list of names) and runtime, or an
+    empty dict if unavailable. Results are cached per (media_type, tmdb_id).
+    With strict, a failing TMDB raises UpstreamError instead.
     """
     if not TMDB_API_KEY or not tmdb_id:
-        return None
-    
+        return {}
+
+    key = (media_type, tmdb_id)
+    metadata = _tmdb_cache.get(key)
+    if metadata is not None:
+        return metadata
+
     try:
         url = f"{TMDB_API_BASE}/{media_type}/{tmdb_id}"
         params = {"api_key": TMDB_API_KEY}
-        resp = requests.get(url, params=params, timeout=10)
-        if resp.status_code == 200:
+        with metrics.stage("tmdb"):
+            resp = http_client.get(url, params=params, timeout=10)
+    except Exception as e:
+        if strict:
+            raise UpstreamError(f"TMDB request failed: {e}") from e
+        return {}
+
+    if resp.status_code == 200:
+        try:
             data = resp.json()
             poster_path = data.get("poster_path")
-            if poster_path:
-                return f"{TMDB_IMAGE_BASE}{poster_path}"
-    except Exception:
-        pass
-    return None
+            metadata = {
+                "poster_url": f"{TMDB_IMAGE_BASE}{poster_path}" if poster_path else None,
+                "genres": [g.get("name", "") for g in data.get("genres", [])],
+                "runtime": data.get("runtime") or 0,
+            }
+        except (ValueError, AttributeError, TypeError) as e:
+            # Malformed body; treated like a transient error and not cached
+            if strict:
+                raise UpstreamError(f"TMDB returned an invalid body: {e}") from e
+            return {}
+    elif resp.status_code == 404:
+        metadata = {}
+    else:
+        # Don't cache transient upstream errors
+        if strict:
+            raise UpstreamError(f"TMDB returned {resp.status_code}")
+        return {}
+
+    _tmdb_cache.set(key, metadata)
+    return metadata
 
 
-def get_tmdb_details(tmdb_id, media_type="tv"):
+def get_tmdb_poster(tmdb_id, media_type="tv"):
     """
-    Fetch detailed info from TMDB API including genres, year, runtime, etc.
+    Fetch poster image URL from TMDB API.
     media_type: 'tv' for shows, 'movie' for movies
-    Returns dict with details or empty dict.
+    Returns poster URL or None if not found.
     """
-    if not TMDB_API_KEY or not tmdb_id:
-        return {}
-    
-    try:
-        url = f"{TMDB_API_BASE}/{media_type}/{tmdb_id}"
-        params = {"api_key": TMDB_API_KEY}
-        resp = requests.get(url, params=params, timeout=10)
-        if resp.status_code == 200:
-            return resp.json()
-    except Exception:
-        pass
-    return {}
+    return get_tmdb_metadata(tmdb_id, media_type).get("poster_url")